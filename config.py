@@ -15,3 +15,67 @@ LOGIN_URL = "https://passport.meituan.com/useraccount/login?continue=https%3A%2F
 COOKIE_POOL_SIZE = 10
 CRAWLER_RETRY_TIMES = 3
 CHROME_DRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH", "/usr/local/bin/chromedriver")
+
+# 自适应限速（AIMD 令牌桶，通过 Redis 在多个 worker 之间共享）
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_PREFIX = "ratelimit"
+# 每个身份维度的参数：initial/min/max/step 单位为 请求数/秒，burst 为桶容量
+RATE_LIMITS = {
+    "cookie": {"initial": 0.2, "min": 0.02, "max": 1.0, "step": 0.05, "burst": 2},
+    "host": {"initial": 1.0, "min": 0.1, "max": 5.0, "step": 0.2, "burst": 5},
+}
+RATE_LIMIT_SUCCESS_WINDOW = 10  # 连续成功多少次后加速一次
+RATE_LIMIT_BACKOFF_FACTOR = 0.5  # 遇到限流信号时的乘性退避系数
+RATE_LIMIT_THROTTLE_STATUS = (403, 429)
+
+# 日志
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "0") == "1"  # 队列异步模式，格式化和文件 I/O 在后台线程完成
+LOG_JSON = os.environ.get("LOG_JSON", "0") == "1"  # 输出单行 JSON 结构化日志
+LOG_RATE_LIMIT = int(os.environ.get("LOG_RATE_LIMIT", "0"))  # 每个调用位置每秒最多输出的 INFO 日志数，0 表示不限制
+
+# 本地爬取服务
+SERVICE_HOST = os.environ.get("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("SERVICE_PORT", "8765"))
+SERVICE_POOL_SIZE = int(os.environ.get("SERVICE_POOL_SIZE", "2"))
+SERVICE_MAX_BODY = int(os.environ.get("SERVICE_MAX_BODY", str(64 * 1024)))  # POST 请求体上限（字节）
+
+# 爬取结果缓存（按 encryptMockTaskNo / voteTaskNo）
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_PREFIX = "crawl_cache"
+RESULT_CACHE_SUCCESS_TTL = int(os.environ.get("RESULT_CACHE_SUCCESS_TTL", "1800"))  # 成功结果缓存时间（秒）
+RESULT_CACHE_FAILURE_TTL = int(os.environ.get("RESULT_CACHE_FAILURE_TTL", "86400"))  # 错误链接等永久失败缓存时间（秒）
+
+# 多节点 worker 协调
+WORKER_PREFIX = "workers"
+WORKER_HEARTBEAT_INTERVAL = int(os.environ.get("WORKER_HEARTBEAT_INTERVAL", "10"))  # 心跳间隔（秒）
+WORKER_HEARTBEAT_TTL = int(os.environ.get("WORKER_HEARTBEAT_TTL", "45"))  # 超过该时间无心跳即视为 worker 已失联
+
+# 截图与性能分析产物目录
+SCREENSHOT_DIR = os.environ.get("SCREENSHOT_DIR", "/mnt/data/screenshots")
+
+# 爬取性能分析：指定任务、按比例抽样、或超过延迟阈值时保存
+PROFILE_TASK_IDS = set(filter(None, os.environ.get("PROFILE_TASK_IDS", "").split(",")))  # 需要分析的任务 ID
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))  # 随机抽样比例，0~1
+PROFILE_LATENCY_THRESHOLD = float(os.environ.get("PROFILE_LATENCY_THRESHOLD", "0"))  # 秒，超过则保存低开销采样结果，0 表示关闭
+PROFILE_TRACE_CATEGORIES = ["devtools.timeline", "v8.execute", "blink.user_timing", "loading", "netlog"]
+PROFILE_TRACE_START_TIMEOUT = float(os.environ.get("PROFILE_TRACE_START_TIMEOUT", "1"))  # 秒，等待 Chrome trace 开始记录的上限（期间持有爬虫锁）
+
+# 导出
+EXPORT_BATCH_SIZE = 1000  # 每次从 MongoDB 拉取的文档数
+EXPORT_CHUNK_SIZE = 10000  # 每次写出的文档数（Parquet 中即每个 row group 的行数）
+
+# JSON 编解码后端：auto（优先 orjson，其次 msgspec）/ orjson / msgspec / json
+JSON_CODEC = os.environ.get("JSON_CODEC", "auto")
+
+# 评论分页：fetch（在页面内并发请求剩余分页）/ click（点击“加载更多”）
+COMMENT_PAGINATION = os.environ.get("COMMENT_PAGINATION", "fetch")
+COMMENT_FETCH_PARALLELISM = int(os.environ.get("COMMENT_FETCH_PARALLELISM", "4"))  # 页面内同时进行的请求数
+COMMENT_FETCH_MAX_PAGES = int(os.environ.get("COMMENT_FETCH_MAX_PAGES", "100"))  # 最多抓取的评论页数
+COMMENT_FETCH_TIMEOUT = 60  # 单次 execute_async_script 的超时时间（秒）
+# 重放请求时去掉的请求头：浏览器禁止脚本设置的头，以及由页面签名 SDK 重新生成的签名头
+COMMENT_FETCH_DROP_HEADERS = {"host", "content-length", "cookie", "origin", "referer", "user-agent",
+                              "accept-encoding", "connection", "mtgsig"}
+
+# 并行扫码登录
+LOGIN_MAX_SESSIONS = int(os.environ.get("LOGIN_MAX_SESSIONS", "4"))  # 同时进行的登录会话上限
+LOGIN_QR_DIR = os.environ.get("LOGIN_QR_DIR", "qrcodes")  # 各会话二维码图片的保存目录
@@ -0,0 +1,279 @@
+import base64
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import config
+from crawl_tool import build_result
+from crawler.cookies_pool import CookiesPool
+from crawler.crawler_pool import CrawlerPool
+from crawler.login_manager import LoginManager
+from crawler.rate_limiter import RateLimiter
+from crawler.result_cache import ResultCache, task_key_from_url
+from utils import codec
+from utils.logger import Logger, task_context
+
+logger = Logger(__name__).get_logger()
+
+
+class _Pending:
+    """一次正在进行的爬取，相同 URL 的并发请求共享同一结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class CrawlService:
+    def __init__(self, pool_size=config.SERVICE_POOL_SIZE):
+        """
+        常驻爬取服务：维护一组预热好的浏览器，合并重复请求，并提供扫码登录入口
+
+        :param pool_size: 浏览器实例数量
+        """
+        self.cookies_pool = CookiesPool(max_size=100)
+        rate_limiter = RateLimiter() if config.RATE_LIMIT_ENABLED else None
+        self.pool = CrawlerPool(self.cookies_pool, size=pool_size, rate_limiter=rate_limiter)
+        self.cache = ResultCache() if config.RESULT_CACHE_ENABLED else None
+        self.login_manager = LoginManager(self.cookies_pool)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def crawl(self, url, profile=False):
+        """
+        爬取 URL；若相同 URL 已在爬取中，则等待并复用其结果
+
+        :param url: 目标 URL
+        :param profile: 是否对本次爬取做性能分析；为 True 时不合并请求、不读缓存，保证实际爬取一次
+        :return: (状态, 结果)，状态为 "ok" / "wrong link" / "failed"
+        """
+        if profile:
+            return self._crawl(url, profile=True)
+        with self._lock:
+            pending = self._inflight.get(url)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[url] = _Pending()
+        if not owner:
+            logger.info(f"合并重复请求，等待进行中的爬取: {url}")
+            pending.event.wait()
+            return pending.result
+
+        try:
+            pending.result = self._crawl(url)
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+            pending.event.set()
+        return pending.result
+
+    def _crawl(self, url, profile=False):
+        def crawl(u):
+            with self.pool.acquire() as crawler:
+                return crawler.crawl_page(u, retry=3, profile=profile)
+
+        try:
+            detail, comment = self.cache.get_or_crawl(url, crawl) if self.cache and not profile else crawl(url)
+        except Exception as e:
+            logger.error(f"爬取 {url} 时发生异常: {e}", exc_info=True)
+            return "failed", None
+        if detail == "wrong link":
+            return "wrong link", None
+        if not isinstance(detail, dict):
+            return "failed", None
+        return "ok", build_result(url, detail, comment)
+
+    def start_login(self, sessions=1, timeout=120):
+        """
+        并行启动扫码登录会话，每个会话使用独立的轻量浏览器，不占用爬取池
+
+        :param sessions: 希望启动的会话数
+        :return: 实际启动的会话 ID 列表
+        """
+        return [s.id for s in self.login_manager.start_sessions(sessions, timeout=timeout)]
+
+    def refill_login(self, target, timeout=120):
+        """
+        按 cookies 池缺口启动扫码登录会话
+
+        :param target: 期望的 cookies 数量
+        :return: 实际启动的会话 ID 列表
+        """
+        return [s.id for s in self.login_manager.refill(target, timeout=timeout)]
+
+    def login_status(self):
+        sessions = self.login_manager.status()
+        waiting = [s for s in sessions if s["qr_code"]]
+        return {
+            "logging_in": any(s["state"] in ("starting", "waiting_scan") for s in sessions),
+            "qr_code": waiting[0]["qr_code"] if waiting else "",
+            "sessions": sessions,
+        }
+
+    def status(self):
+        with self._lock:
+            inflight = len(self._inflight)
+        return {
+            "pool": self.pool.status(),
+            "cookies": len(self.cookies_pool.cookies_list),
+            "inflight": inflight,
+            "login_sessions": len(self.login_manager.active_sessions()),
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    def close(self):
+        self.pool.quit()
+
+
+class CrawlRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /status                               服务与浏览器池状态
+    GET  /crawl?url=...[&profile=1]            爬取（POST /crawl 时以 JSON {"url": ..., "profile": true} 传参），
+                                               profile 为真时对本次爬取做性能分析
+    POST /login                                启动扫码登录（JSON {"sessions": n} 并行启动多个会话，
+                                               {"target": n} 按 cookies 池缺口补足到 n 个）
+    GET  /login/qrcode[?format=png&session=id] 登录二维码，默认为第一个等待扫码的会话
+    """
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send_json(self, code, data):
+        body = codec.dumpb(data)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle_crawl(self, url, profile=False):
+        if not url or not url.startswith("http"):
+            self._send_json(400, {"error": "invalid url"})
+            return
+        # 与 main.py 一致，以任务 ID 作为日志关联 ID，链接中没有任务 ID 时退回使用 URL
+        task_key = task_key_from_url(url)
+        with task_context(task_key.split(":", 1)[1] if task_key else url):
+            status, result = self.service.crawl(url, profile=profile)
+        if status == "ok":
+            self._send_json(200, result)
+        elif status == "wrong link":
+            self._send_json(404, {"error": "wrong link", "raw_url": url})
+        else:
+            self._send_json(502, {"error": "failed", "raw_url": url})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path == "/status":
+            self._send_json(200, self.service.status())
+        elif parsed.path == "/crawl":
+            self._handle_crawl(query.get("url", [""])[0],
+                               profile=query.get("profile", [""])[0].lower() in ("1", "true", "yes"))
+        elif parsed.path == "/login/qrcode":
+            login = self.service.login_status()
+            if query.get("format", [""])[0] == "png":
+                session_id = query.get("session", [""])[0]
+                qr_code = login["qr_code"]
+                if session_id:
+                    qr_code = next((s["qr_code"] for s in login["sessions"] if str(s["id"]) == session_id), "")
+                if not qr_code:
+                    self._send_json(404, {"error": "no qr code"})
+                    return
+                body = base64.b64decode(qr_code)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(200, login)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        # 负数会让 read() 一直读到客户端断开，占住处理线程
+        if length < 0 or length > config.SERVICE_MAX_BODY:
+            self._send_json(400, {"error": "invalid content-length"})
+            return
+        try:
+            payload = codec.loads(self.rfile.read(length) or b"{}")
+        except (codec.DecodeError, UnicodeDecodeError):
+            self._send_json(400, {"error": "invalid json"})
+            return
+        if not isinstance(payload, dict):
+            self._send_json(400, {"error": "request body must be a json object"})
+            return
+        if parsed.path == "/crawl":
+            url = payload.get("url", "")
+            self._handle_crawl(url if isinstance(url, str) else "", profile=payload.get("profile") is True)
+        elif parsed.path == "/login":
+            try:
+                timeout = int(payload.get("timeout", 120))
+                target = int(payload["target"]) if "target" in payload else None
+                sessions = int(payload.get("sessions", 1))
+            except (TypeError, ValueError):
+                self._send_json(400, {"error": "sessions, target and timeout must be integers"})
+                return
+            if target is not None:
+                started = self.service.refill_login(target, timeout=timeout)
+                self._send_json(202 if started else 200, {"started": started})
+                return
+            started = self.service.start_login(sessions=sessions, timeout=timeout)
+            self._send_json(202 if started else 409, {"started": started})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        # Unix socket 下没有客户端地址，不使用默认的 address_string
+        logger.info(format % args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, host=config.SERVICE_HOST, port=config.SERVICE_PORT, unix_socket=None):
+    """
+    启动 HTTP 服务，unix_socket 非空时监听 Unix 套接字，否则监听 host:port
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, CrawlRequestHandler)
+        logger.info(f"爬取服务已启动: unix://{unix_socket}")
+    else:
+        server = ThreadingHTTPServer((host, port), CrawlRequestHandler)
+        logger.info(f"爬取服务已启动: http://{host}:{port}")
+    server.service = service
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="本地常驻爬取服务")
+    parser.add_argument("--host", default=config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="监听 Unix 套接字而不是 TCP 端口")
+    parser.add_argument("--pool-size", type=int, default=config.SERVICE_POOL_SIZE, help="预热的浏览器数量")
+    args = parser.parse_args()
+
+    service = CrawlService(pool_size=max(1, args.pool_size))
+    try:
+        serve(service, host=args.host, port=args.port, unix_socket=args.unix)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -1,11 +1,18 @@
 import undetected_chromedriver as uc
 import config
-import json
+import queue
+import sys
+import threading
 import time
 from crawler.core_crawler import CoreCrawler
 from crawler.webdriver_mgr import WebDriverManager
 from crawler.cookies_pool import CookiesPool
 from crawler.login_handler import LoginHandler
+from crawler.login_manager import LoginManager
+from crawler.crawler_pool import CrawlerPool
+from crawler.rate_limiter import RateLimiter
+from crawler.result_cache import ResultCache
+from utils import codec
 
 
 def init_webdriver():
@@ -35,19 +42,184 @@ def run_login(login_handler):
         print(f"登录失败: {e}")
 
 
+def run_parallel_login(cookies_pool, sessions, timeout=120):
+    """
+    并行启动多个扫码登录会话，每个会话的二维码保存为独立文件
+
+    :param cookies_pool: CookiesPool 实例
+    :param sessions: 会话数量
+    :param timeout: 每个会话等待扫码的最大时间（秒）
+    """
+    manager = LoginManager(cookies_pool, max_sessions=sessions)
+    manager.start_sessions(sessions, timeout=timeout)
+    # 等待二维码生成后打印路径
+    deadline = time.time() + timeout
+    pending = {s["id"] for s in manager.status()}
+    while pending and time.time() < deadline:
+        for s in manager.status():
+            if s["id"] in pending and s["state"] != "starting":
+                if s["state"] == "waiting_scan":
+                    print(f"会话 {s['id']} 二维码: {s['qr_code_path']}")
+                pending.discard(s["id"])
+        time.sleep(0.5)
+    succeeded = manager.wait()
+    print(f"登录完成：成功 {succeeded}/{sessions}，cookies 已加入池中")
+
+
+def build_result(url, detail, comment):
+    """
+    组装与入库格式一致的结果文档
+    """
+    return {
+        "raw_url": url,
+        "uploader": 0,  # 使用 Int64 表示 bigint
+        "upload_timestamp": int(time.time()),  # 毫秒级时间戳
+        "detail": detail,
+        "comment": comment
+    }
+
+
+def iter_urls(source):
+    """
+    从文件或 stdin（source 为 "-"）逐行读取 URL，空行和 # 开头的行会被跳过
+
+    :param source: 文件路径或 "-"
+    :return: URL 生成器
+    """
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith("#"):
+                continue
+            if not url.startswith("http"):
+                print(f"跳过无效的 URL: {url}", file=sys.stderr)
+                continue
+            yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def run_batch(source, concurrency=1, test_mode=False, profile=False):
+    """
+    批量爬取：复用预热好的浏览器，流式读取 URL 并流式输出结果
+
+    :param source: URL 文件路径或 "-"（stdin）
+    :param concurrency: 并发浏览器数量
+    :param test_mode: True 时以 NDJSON 输出到 stdout，否则批量写入 MongoDB
+    :param profile: 是否对每个 URL 做性能分析（不读缓存）
+    """
+    cookies_pool = CookiesPool(max_size=100)
+    rate_limiter = RateLimiter() if config.RATE_LIMIT_ENABLED else None
+    pool = CrawlerPool(cookies_pool, size=concurrency, rate_limiter=rate_limiter)
+    collection = None
+    writer = None
+    if not test_mode:
+        from pymongo import MongoClient
+        from dbh.mongodb_handler import MongoBatchWriter
+        collection = MongoClient(config.MONGO_CONN)[config.DB_NAME][config.PROBLEM_COLLECTION]
+        writer = MongoBatchWriter(collection, key="raw_url")
+
+    cache = ResultCache() if config.RESULT_CACHE_ENABLED and not profile else None
+    tasks = queue.Queue(maxsize=concurrency * 2)
+    output_lock = threading.Lock()
+    stats = {"ok": 0, "failed": 0, "exists": 0}
+
+    def count(key):
+        with output_lock:
+            stats[key] += 1
+
+    def emit(doc):
+        with output_lock:
+            sys.stdout.write(codec.dumps(doc) + "\n")
+            sys.stdout.flush()
+
+    def crawl(u):
+        with pool.acquire() as crawler:
+            return crawler.crawl_page(u, retry=3, profile=profile)
+
+    def process(url):
+        if collection is not None and collection.find_one({"raw_url": url}, {"_id": 1}):
+            count("exists")
+            return
+        detail, comment = cache.get_or_crawl(url, crawl) if cache else crawl(url)
+        if not isinstance(detail, dict):
+            count("failed")
+            if test_mode:
+                emit({"raw_url": url, "error": detail or "failed"})
+            return
+        res = build_result(url, detail, comment)
+        if test_mode:
+            emit(res)
+        else:
+            writer.write(res)
+        count("ok")
+
+    def worker():
+        while True:
+            url = tasks.get()
+            if url is None:
+                break
+            # 单条 URL 的任何异常（包括 MongoDB 查询/写入失败）都不能让线程退出，否则 tasks.put 会永久阻塞
+            try:
+                process(url)
+            except Exception as e:
+                print(f"爬取异常 {url}: {e}", file=sys.stderr)
+                count("failed")
+                if test_mode:
+                    emit({"raw_url": url, "error": "failed"})
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    try:
+        for url in iter_urls(source):
+            tasks.put(url)
+    finally:
+        for _ in threads:
+            tasks.put(None)
+        for t in threads:
+            t.join()
+        if writer:
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"批量写入失败: {e}", file=sys.stderr)
+            print(f"批量写入完成：新增 {writer.inserted}，已存在 {writer.skipped + stats['exists']}，"
+                  f"未写入 {writer.pending}", file=sys.stderr)
+        pool.quit()
+    print(f"批量爬取结束：成功 {stats['ok']}，失败 {stats['failed']}", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="美团题目爬取工具")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--login", action="store_true", help="扫码登录并将 cookies 加入池中")
+    mode.add_argument("--crawl", metavar="URL", help="爬取单个 URL 并写入 MongoDB")
+    mode.add_argument("--crawl-test", metavar="URL", help="爬取单个 URL 并打印结果")
+    mode.add_argument("--crawl-batch", metavar="FILE", help="从文件（- 表示 stdin）读取 URL，批量爬取并写入 MongoDB")
+    mode.add_argument("--crawl-test-batch", metavar="FILE", help="从文件（- 表示 stdin）读取 URL，批量爬取并以 NDJSON 输出")
+    parser.add_argument("--concurrency", type=int, default=1, help="批量模式下的并发浏览器数量（默认 1）")
+    parser.add_argument("--sessions", type=int, default=1, help="登录模式下并行的扫码会话数量（默认 1）")
+    parser.add_argument("--profile", action="store_true", help="对爬取做性能分析（不读缓存），产物保存在截图目录")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    # 读取运行参数，判断是--login还是--crawl
-    import sys
-    if len(sys.argv) < 2:
-        print("请提供运行参数：--login 或 --crawl")
-        sys.exit(1)
-    run_mode = sys.argv[1]
-    if run_mode not in ['--login', '--crawl', '--crawl-test']:
-        print("无效的运行参数，请使用 --login 或 --crawl")
-        sys.exit(1)
-    webdriver_manager = init_webdriver()
+    args = parse_args()
+    if args.crawl_batch or args.crawl_test_batch:
+        run_batch(args.crawl_batch or args.crawl_test_batch,
+                  concurrency=max(1, args.concurrency),
+                  test_mode=bool(args.crawl_test_batch),
+                  profile=args.profile)
+        sys.exit(0)
     cookies_pool = CookiesPool(max_size=100)
-    if run_mode == '--login':
+    if args.login and args.sessions > 1:
+        run_parallel_login(cookies_pool, args.sessions)
+    elif args.login:
+        webdriver_manager = init_webdriver()
         login_handler = LoginHandler(
             webdriver_manager=webdriver_manager,
             cookies_pool=cookies_pool,
@@ -55,26 +227,22 @@ if __name__ == "__main__":
         )
         run_login(login_handler)
     else:
-        # 读取--crawl的url
-        if len(sys.argv) < 3:
-            print("请提供要爬取的 URL")
-            sys.exit(1)
-        url_to_crawl = sys.argv[2]
+        url_to_crawl = args.crawl or args.crawl_test
         if not url_to_crawl.startswith("http"):
             print("无效的 URL，请确保以 http:// 或 https:// 开头")
             sys.exit(1)
-        crawler = CoreCrawler(webdriver_manager, cookies_pool)
-        detail, comment = crawler.crawl_page(url_to_crawl, retry=3)
+
+        def crawl(u):
+            # 只有缓存未命中时才启动浏览器
+            crawler = CoreCrawler(init_webdriver(), cookies_pool)
+            return crawler.crawl_page(u, retry=3, profile=args.profile)
+
+        cache = ResultCache() if config.RESULT_CACHE_ENABLED and not args.profile else None
+        detail, comment = cache.get_or_crawl(url_to_crawl, crawl) if cache else crawl(url_to_crawl)
         # 生成格式化后的json并打印
-        res = {
-            "raw_url": url_to_crawl,
-            "uploader": 0,  # 使用 Int64 表示 bigint
-            "upload_timestamp": int(time.time()),  # 毫秒级时间戳
-            "detail": detail,
-            "comment": comment
-        }
-        if run_mode == '--crawl-test':
-            print(json.dumps(res, ensure_ascii=False, indent=2))
+        res = build_result(url_to_crawl, detail, comment)
+        if args.crawl_test:
+            print(codec.dumps(res, pretty=True))
             sys.exit(0)
         else:
             from pymongo import MongoClient
@@ -87,4 +255,4 @@ if __name__ == "__main__":
                 print("该题目已存在，跳过插入")
             else:
                 result = collection.insert_one(res)
-                print("插入成功！文档 ID:", result.inserted_id)
\ No newline at end of file
+                print("插入成功！文档 ID:", result.inserted_id)
@@ -2,7 +2,7 @@
 
 import random
 import threading
-import json
+from utils import codec
 import logging
 from utils.logger import Logger
 
@@ -19,21 +19,22 @@ class CookiesPool:
     def save_cookies_to_file(self, file_path):
         # save cookie json to file
         with self.lock:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.cookies_list, f, ensure_ascii=False, indent=4)
+            data = codec.dumpb(self.cookies_list)
+            with open(file_path, 'wb') as f:
+                f.write(data)
             logger.info(f"Cookies 已保存到文件: {file_path}")
 
     def load_cookies_from_file(self, file_path):
         """从文件加载 cookies"""
         with self.lock:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.cookies_list = json.load(f)
+                with open(file_path, 'rb') as f:
+                    self.cookies_list = codec.loads(f.read())
                 self.cookie_id_counter = max((c["id"] for c in self.cookies_list), default=0)
                 logger.info(f"Cookies 已从文件加载: {file_path}")
             except FileNotFoundError:
                 logger.warning(f"Cookies 文件未找到: {file_path}, 将使用空池")
-            except json.JSONDecodeError:
+            except codec.DecodeError:
                 logger.error(f"Cookies 文件格式错误: {file_path}, 将使用空池")
 
     def add_cookies(self, cookies):
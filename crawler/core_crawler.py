@@ -1,29 +1,85 @@
 # crawler/core_crawler.py
-import json
+import os
 import threading
 import time
 import logging
 import random
+import math
+from urllib.parse import urlparse, parse_qsl, quote, unquote_plus
 
+import config
 from selenium.common import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from crawler.crawl_profiler import CrawlProfiler
+from crawler.rate_limiter import cookie_identity
+from utils import codec
 from utils.logger import Logger
 from utils.exceptions import NoAvailableCookiesError, WebDriverCrashError
 
 logger = Logger(__name__).get_logger()
 
+# 评论接口可能使用的分页字段
+PAGE_KEYS = ("pageNo", "pageNum", "pageIndex", "page", "current")
+OFFSET_KEYS = ("offset", "start")
+SIZE_KEYS = ("pageSize", "size", "limit")
+TOTAL_KEYS = ("total", "totalCount", "totalNum", "count")
+LIST_KEYS = ("list", "records", "comments", "items", "rows")
+
+# 在页面内以有限并发重放请求；走页面自己的 fetch，从而复用页面的 cookies 和签名逻辑
+FETCH_PAGES_SCRIPT = """
+const [requests, parallelism, done] = arguments;
+const results = new Array(requests.length);
+let next = 0;
+async function worker() {
+    while (next < requests.length) {
+        const i = next++;
+        const r = requests[i];
+        try {
+            const resp = await fetch(r.url, {method: r.method, headers: r.headers, body: r.body, credentials: 'include'});
+            results[i] = {status: resp.status, body: await resp.text()};
+        } catch (e) {
+            results[i] = {status: 0, error: String(e)};
+        }
+    }
+}
+const workers = [];
+for (let k = 0; k < Math.min(parallelism, requests.length); k++) workers.push(worker());
+Promise.all(workers).then(() => done(results));
+"""
+
+def _replace_param(encoded, key, value):
+    """
+    只替换 URL 编码的参数串（查询串或表单请求体）中 key 的值，其余参数保持原样，
+    避免重新编码（如 %20 变成 +）导致签名校验失败
+    """
+    parts = encoded.split("&")
+    for i, part in enumerate(parts):
+        name, sep, _ = part.partition("=")
+        if sep and unquote_plus(name) == key:
+            parts[i] = f"{name}={quote(str(value), safe='')}"
+    return "&".join(parts)
+
+
 class CoreCrawler:
-    def __init__(self, webdriver_manager, cookies_pool):
+    def __init__(self, webdriver_manager, cookies_pool, rate_limiter=None, profiler=None,
+                 comment_pagination=config.COMMENT_PAGINATION):
         """
         初始化核心爬虫类
 
         :param webdriver_manager: WebDriverManager 实例
         :param cookies_pool: CookiesPool 实例
+        :param rate_limiter: RateLimiter 实例（可选），为空时不限速
+        :param profiler: CrawlProfiler 实例（可选），为空时按 config 中的性能分析配置创建
+        :param comment_pagination: 评论分页策略，"fetch" 在页面内并发请求剩余分页，"click" 点击加载更多
         """
         self.webdriver_manager = webdriver_manager
         self.cookies_pool = cookies_pool
+        self.rate_limiter = rate_limiter
+        self.profiler = profiler or CrawlProfiler()
+        self.comment_pagination = comment_pagination
+        self.last_screenshot = None
         self.driver = self.webdriver_manager.get_driver()
         self.lock = threading.Lock()
 
@@ -109,33 +165,208 @@ class CoreCrawler:
         comment_data = []
         keywords = ["getmocktasksharedetail", "pagequerycomment"]
         for entry in logs:
-            log = json.loads(entry["message"])["message"]
+            message = entry["message"]
+            # 绝大多数日志与目标接口无关，先做子串过滤再解码
+            if "Network.responseReceived" not in message or not any(kw in message for kw in keywords):
+                continue
+            log = codec.loads(message)["message"]
 
             if log["method"] == "Network.responseReceived":
                 url = log["params"]["response"]["url"]
 
                 if any(kw in url for kw in keywords):
+                    status = log["params"]["response"].get("status")
+                    if status in config.RATE_LIMIT_THROTTLE_STATUS:
+                        logger.warning(f"接口返回限流状态码 {status}: {url}")
+                        return {"code": -429, "message": f"Throttled with status {status}"}, []
                     # 获取响应体
                     try:
                         response_body = self.driver.execute_cdp_cmd(
                             "Network.getResponseBody", {"requestId": log["params"]["requestId"]}
                         )
-                        json_data = json.loads(response_body["body"])
+                        json_data = codec.loads(response_body["body"])
                         # print(f"找到匹配的请求: {url}")
                         if "getmocktasksharedetail" in url:
                             detail_data = json_data
                         else:
                             comment_data.append(json_data)
                     except WebDriverException as e:
-                        logger.error(f"获取响应体失败: {e}")
-                        import traceback
-                        exc_info = traceback.format_exc()
-                        logger.error(f"异常信息: {exc_info}")
+                        logger.error(f"获取响应体失败: {e}", exc_info=True)
                         return {"code": -9999, "message": "Failed to fetch problem details"}, []
-                    except json.JSONDecodeError as e:
+                    except codec.DecodeError as e:
                         logger.error(f"解析 JSON 失败: {e}")
         return detail_data, comment_data
 
+    def _find_comment_request(self, logs):
+        """
+        从性能日志中找到第一个评论分页请求
+
+        :return: {"url", "method", "headers", "body"}，未找到返回 None
+        """
+        for entry in logs:
+            message = entry["message"]
+            if "Network.requestWillBeSent" not in message or "pagequerycomment" not in message:
+                continue
+            log = codec.loads(message)["message"]
+            if log["method"] != "Network.requestWillBeSent":
+                continue
+            request = log["params"]["request"]
+            if "pagequerycomment" not in request["url"]:
+                continue
+            body = request.get("postData")
+            if body is None and request.get("hasPostData"):
+                try:
+                    body = self.driver.execute_cdp_cmd(
+                        "Network.getRequestPostData", {"requestId": log["params"]["requestId"]}
+                    )["postData"]
+                except WebDriverException as e:
+                    logger.warning(f"获取评论请求体失败: {e}")
+                    return None
+            headers = {k: v for k, v in request.get("headers", {}).items()
+                       if k.lower() not in config.COMMENT_FETCH_DROP_HEADERS and not k.lower().startswith("sec-")}
+            return {"url": request["url"], "method": request.get("method", "GET"), "headers": headers, "body": body}
+        return None
+
+    @staticmethod
+    def _comment_items(page):
+        """取出一页评论响应中的评论列表"""
+        data = page.get("data") if isinstance(page, dict) else None
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict):
+            for key in LIST_KEYS:
+                if isinstance(data.get(key), list):
+                    return data[key]
+        return None
+
+    def _comment_page_builder(self, request):
+        """
+        识别评论请求中的分页字段（查询参数、JSON 请求体或表单请求体）
+
+        :return: (make_request(i), page_size)，make_request(i) 生成第一页之后第 i 页的请求；无法识别时返回 (None, None)
+        """
+        parsed = urlparse(request["url"])
+        query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+        body, body_format = request["body"], None
+        if body:
+            try:
+                body = codec.loads(body)
+                body_format = "json" if isinstance(body, dict) else None
+            except codec.DecodeError:
+                body = dict(parse_qsl(body, keep_blank_values=True))
+                body_format = "form" if body else None
+
+        for params, location in ((query, "query"), (body if body_format else {}, body_format)):
+            page_key = next((k for k in PAGE_KEYS if k in params), None)
+            offset_key = next((k for k in OFFSET_KEYS if k in params), None)
+            size_key = next((k for k in SIZE_KEYS if k in params), None)
+            if not page_key and not (offset_key and size_key):
+                continue
+            try:
+                size = int(params[size_key]) if size_key else None
+                start = int(params[page_key or offset_key])
+            except (TypeError, ValueError):
+                continue
+
+            def make_request(i, params=params, location=location, page_key=page_key,
+                             offset_key=offset_key, size=size, start=start):
+                key = page_key or offset_key
+                value = start + i if page_key else start + i * size
+                url, req_body = request["url"], request["body"]
+                if location == "query":
+                    url = parsed._replace(query=_replace_param(parsed.query, key, value)).geturl()
+                elif location == "json":
+                    req_body = codec.dumps({**params, key: value})
+                else:
+                    req_body = _replace_param(req_body, key, value)
+                return {"url": url, "method": request["method"], "headers": request["headers"], "body": req_body}
+
+            return make_request, size
+        return None, None
+
+    def _fetch_pages_in_page(self, requests):
+        """在页面内并发执行请求，返回解析后的 JSON 列表（失败的请求为 None）"""
+        self.driver.set_script_timeout(config.COMMENT_FETCH_TIMEOUT)
+        try:
+            results = self.driver.execute_async_script(FETCH_PAGES_SCRIPT, requests, config.COMMENT_FETCH_PARALLELISM)
+        finally:
+            # 丢弃页面内请求产生的性能日志，避免被回退逻辑或同一浏览器的下一次爬取读到
+            self.driver.get_log("performance")
+        pages = []
+        for request, result in zip(requests, results):
+            if not result or result.get("status") != 200:
+                logger.warning(f"评论分页请求失败: {result and (result.get('error') or result.get('status'))}")
+                pages.append(None)
+                continue
+            try:
+                pages.append(codec.loads(result["body"]))
+            except codec.DecodeError as e:
+                logger.error(f"解析评论分页 JSON 失败: {e}")
+                pages.append(None)
+        return pages
+
+    def _fetch_remaining_comments(self, logs, first_page):
+        """
+        参照第一个评论请求，在页面内并发抓取剩余的全部评论分页
+
+        :param logs: 性能日志
+        :param first_page: 第一页评论响应
+        :return: 剩余分页的响应列表；无法识别分页方式或有分页请求失败时返回 None
+        """
+        request = self._find_comment_request(logs)
+        if not request:
+            logger.info("未找到评论分页请求")
+            return None
+        make_request, size = self._comment_page_builder(request)
+        if not make_request:
+            logger.info(f"无法识别评论分页参数: {request['url']}")
+            return None
+
+        max_pages = config.COMMENT_FETCH_MAX_PAGES
+        data = first_page.get("data") if isinstance(first_page, dict) else None
+        total = next((data[k] for k in TOTAL_KEYS if isinstance(data, dict) and isinstance(data.get(k), int)), None)
+        if total is not None and size:
+            # 已知总数：一次往返取完
+            page_count = min(math.ceil(total / size), max_pages)
+            pages = self._fetch_pages_in_page([make_request(i) for i in range(1, page_count)]) if page_count > 1 else []
+            failed = sum(1 for p in pages if not p or p.get("code") != 0)
+            if failed:
+                logger.warning(f"评论共 {total} 条，页面内抓取有 {failed}/{len(pages)} 页失败")
+                return None
+            logger.info(f"评论共 {total} 条，页面内并发抓取了 {len(pages)} 页")
+            return pages
+
+        # 总数未知：按并发数分批抓取，直到出现空页或失败
+        pages, i = [], 1
+        while i < max_pages:
+            batch = range(i, min(i + config.COMMENT_FETCH_PARALLELISM, max_pages))
+            results = self._fetch_pages_in_page([make_request(j) for j in batch])
+            for page in results:
+                if not page or page.get("code") != 0:
+                    logger.warning(f"页面内抓取第 {len(pages) + 2} 页评论失败")
+                    return None
+                items = self._comment_items(page)
+                if not items:
+                    logger.info(f"页面内抓取了 {len(pages)} 页剩余评论")
+                    return pages
+                pages.append(page)
+            i += len(batch)
+        logger.warning(f"评论页数达到上限 {max_pages}，剩余评论未抓取")
+        return pages
+
+    def _click_load_more(self):
+        """点击“加载更多”按钮逐页加载评论，最多 4 次"""
+        for _ in range(4):
+            result = self.driver.execute_script("""
+                let btn = document.querySelector('.load-more-button');
+                if (btn) { btn.click(); return true; }
+                return false;
+            """)
+            if not result:
+                logger.info("没有找到加载更多按钮，跳出循环")
+                break
+            time.sleep(random.uniform(0.65, 4.5))  # 等待加载更多按钮点击后的加载时间
+
     def fetch_page_content(self, url):
         """
         【用户自定义】跳转目标页面并截取内容，需由用户实现。
@@ -147,86 +378,120 @@ class CoreCrawler:
             wait = WebDriverWait(self.driver, 4)
             # 等待 class 名为 "load-more-button" 的元素出现
             logger.info("等待页面加载完成，查找 'load-more-button' 元素...")
-            # 找到就点一下，然后继续等继续找，最多循环4次
             load_more_button = wait.until(
                 EC.presence_of_element_located((By.CLASS_NAME, "load-more-button"))
             )
-            # 执行js命令
-            for _ in range(4):
-                result = self.driver.execute_script("""
-                    let btn = document.querySelector('.load-more-button');
-                    if (btn) { btn.click(); return true; }
-                    return false;
-                """)
-                if not result:
-                    logger.info("没有找到加载更多按钮，跳出循环")
-                    break
-                time.sleep(random.uniform(0.65, 4.5))  # 等待加载更多按钮点击后的加载时间
+            if self.comment_pagination == "click":
+                # 找到就点一下，然后继续等继续找，最多循环4次
+                self._click_load_more()
         except TimeoutException:
             pass
         except Exception as e:
             logger.error(f"等待加载更多按钮时发生异常: {e}", exc_info=True)
-        screenshot_filename = f"/mnt/data/screenshots/{int(time.time())}.png"
-        logger.info(f"开始截图到 {screenshot_filename}")
-        self.driver.save_screenshot(screenshot_filename)
         logger.info("获取页面性能日志")
         logs = self.driver.get_log("performance")
         detail_data, comment_data = self._filter_logs_v1(logs)
+        if (self.comment_pagination == "fetch" and isinstance(detail_data, dict)
+                and detail_data.get("code") == 0 and comment_data):
+            try:
+                remaining = self._fetch_remaining_comments(logs, comment_data[0])
+            except WebDriverException as e:
+                logger.error(f"页面内抓取评论失败: {e}")
+                remaining = None
+            if remaining is None:
+                # 无法在页面内分页时回退为点击加载更多
+                self._click_load_more()
+                _, remaining = self._filter_logs_v1(self.driver.get_log("performance"))
+            comment_data.extend(remaining)
+        # 在评论分页（包括回退的点击加载）完成后截图
+        screenshot_filename = os.path.join(config.SCREENSHOT_DIR, f"{int(time.time())}.png")
+        logger.info(f"开始截图到 {screenshot_filename}")
+        self.driver.save_screenshot(screenshot_filename)
+        self.last_screenshot = screenshot_filename
         if not isinstance(detail_data, dict):
             logger.error("未能正确获取题目详情数据")
             return {"code": -2000, "message": "Failed to fetch problem details"}, []
         detail_data["screenshot"] = screenshot_filename
         return detail_data, comment_data
 
-    def crawl_page(self, url, retry=3):
+    def crawl_page(self, url, retry=3, profile=False):
         """
         执行爬取任务的核心方法
 
         :param url: 目标页面地址
         :param retry: 最大重试次数
+        :param profile: 是否强制对本次爬取做性能分析
         :return: 页面内容 或 None
         """
         with self.lock:
-            for attempt in range(1, retry + 1):
-                try:
-                    logger.info(f"尝试爬取页面 (第 {attempt}/{retry} 次): {url}")
+            self.last_screenshot = None
+            session = self.profiler.start(self.driver, url, force=profile)
+            try:
+                detail, comment = self._crawl_page(url, retry)
+            finally:
+                artifacts = self.profiler.finish(session, self.driver, self.last_screenshot) if session else None
+            if artifacts and isinstance(detail, dict):
+                # 在入库文档中记录性能分析产物的位置
+                detail["profile"] = artifacts
+            return detail, comment
+
+    def _crawl_page(self, url, retry):
+        for attempt in range(1, retry + 1):
+            try:
+                logger.info(f"尝试爬取页面 (第 {attempt}/{retry} 次): {url}")
+
+                # 获取可用 cookies
+                cookies = self._ensure_valid_cookies()
+                cookie_key = cookie_identity(cookies)
+                host = urlparse(url).hostname
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(cookie_key, host)
+
+                # 设置 cookies 到浏览器
+                if "cookies" in cookies and cookies["cookies"]:   # 确保 cookies 字段存在且非空
+                    if not self.set_cookies_to_browser(cookies["cookies"]):
+                        # self._handle_invalid_cookies(cookies["id"])
+                        continue
 
-                    # 获取可用 cookies
-                    cookies = self._ensure_valid_cookies()
+                # 清空残留的性能日志，保证后续解析只看到本次页面的请求
+                self.driver.get_log("performance")
 
-                    # 设置 cookies 到浏览器
-                    if "cookies" in cookies and cookies["cookies"]:   # 确保 cookies 字段存在且非空
-                        if not self.set_cookies_to_browser(cookies["cookies"]):
-                            # self._handle_invalid_cookies(cookies["id"])
-                            continue
+                # 跳转目标页面
+                self.driver.get(url)
 
-                    # 跳转目标页面
-                    self.driver.get(url)
+                # 验证是否登录成功（如跳转到了登录页）
+                if url.find("xiaomei/vote") != -1 and self._is_redirected_to_login_page():
+                    logger.warning("检测到被重定向到登录页，cookies 可能已失效")
+                    if self.rate_limiter:
+                        # 只是这个 cookies 失效，不影响 host 的速率
+                        self.rate_limiter.record_throttle(cookie_key)
+                    self._handle_invalid_cookies(cookies["id"])
+                    continue
 
-                    # 验证是否登录成功（如跳转到了登录页）
-                    if url.find("xiaomei/vote") != -1 and self._is_redirected_to_login_page():
-                        logger.warning("检测到被重定向到登录页，cookies 可能已失效")
-                        self._handle_invalid_cookies(cookies["id"])
+                # 执行用户自定义的页面内容截取逻辑
+                detail, comment = self.fetch_page_content(url)
+                if detail and 'code' in detail:
+                    if detail['code'] == -9999:
+                        raise Exception(f"WebDriverCrashProblem: {detail}")
+                    if detail['code'] == -429 and self.rate_limiter:
+                        self.rate_limiter.record_throttle(cookie_key, host)
+                    if detail['code'] != 0 or 'data' not in detail:
+                        logger.error(f"获取题目详情失败，返回内容: {detail}")
+                        if detail['code'] > 0:
+                            # 可能是链接错误导致，直接不继续判断
+                            if self.rate_limiter:
+                                self.rate_limiter.record_success(cookie_key, host)
+                            return "wrong link", []
                         continue
+                    if self.rate_limiter:
+                        self.rate_limiter.record_success(cookie_key, host)
+                    return detail["data"], [i['data'] for i in comment if 'code' in i and i['code'] == 0]
 
-                    # 执行用户自定义的页面内容截取逻辑
-                    detail, comment = self.fetch_page_content(url)
-                    if detail and 'code' in detail:
-                        if detail['code'] == -9999:
-                            raise Exception(f"WebDriverCrashProblem: {detail}")
-                        if detail['code'] != 0 or 'data' not in detail:
-                            logger.error(f"获取题目详情失败，返回内容: {detail}")
-                            if detail['code'] > 0:
-                                # 可能是链接错误导致，直接不继续判断
-                                return "wrong link", []
-                            continue
-                        return detail["data"], [i['data'] for i in comment if 'code' in i and i['code'] == 0]
-
-                except Exception as e:
-                    logger.error(f"爬取过程中发生异常: {e}", exc_info=True)
-                    self.webdriver_manager.restart_driver()
-                    self.driver = self.webdriver_manager.get_driver()
-                    time.sleep(5)
+            except Exception as e:
+                logger.error(f"爬取过程中发生异常: {e}", exc_info=True)
+                self.webdriver_manager.restart_driver()
+                self.driver = self.webdriver_manager.get_driver()
+                time.sleep(5)
 
         logger.error(f"爬取失败，已达最大重试次数: {retry}")
         return None, None
@@ -0,0 +1,251 @@
+# crawler/crawl_profiler.py
+
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+import config
+from crawler.result_cache import TASK_KEY_PARAMS
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval=0.01):
+        """
+        低开销的 Python 栈采样器：后台线程定期采集目标线程的调用栈
+
+        :param thread_id: 目标线程 ID
+        :param interval: 采样间隔（秒）
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        """以 folded stacks 格式输出，可直接用于生成火焰图"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ChromeTracer:
+    def __init__(self, driver, categories):
+        """
+        通过 CDP Tracing 采集页面 trace。Tracing 的数据以事件形式返回，
+        execute_cdp_cmd 收不到事件，因此在独立线程中通过 bidi_connection 建立 CDP 会话
+
+        :param driver: WebDriver 实例
+        :param categories: trace 类别
+        """
+        self.driver = driver
+        self.categories = categories
+        self.events = []
+        self._started = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chrome-tracer", daemon=True)
+
+    def start(self, timeout=config.PROFILE_TRACE_START_TIMEOUT):
+        """启动 trace，返回是否在超时内开始记录（超时后 trace 仍在后台继续启动，只是会错过开头的事件）"""
+        self._thread.start()
+        return self._started.wait(timeout)
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            import trio
+            trio.run(self._session)
+        except Exception as e:
+            logger.error(f"Chrome trace 采集失败: {e}")
+        finally:
+            self._started.set()
+
+    async def _session(self):
+        import trio
+        async with self.driver.bidi_connection() as conn:
+            session, devtools = conn.session, conn.devtools
+
+            async def collect():
+                async for event in session.listen(devtools.tracing.DataCollected, devtools.tracing.TracingComplete):
+                    if isinstance(event, devtools.tracing.TracingComplete):
+                        break
+                    self.events.extend(event.value)
+
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(collect)
+                await trio.sleep(0)  # 让 collect 先注册监听，避免丢失早期事件
+                await session.execute(devtools.tracing.start(
+                    trace_config=devtools.tracing.TraceConfig(included_categories=self.categories),
+                    transfer_mode="ReportEvents",
+                ))
+                self._started.set()
+                await trio.to_thread.run_sync(self._stop.wait)
+                await session.execute(devtools.tracing.end())
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events}, f)
+
+
+class ProfileSession:
+    def __init__(self, mode, reason, driver, categories):
+        """
+        一次爬取的性能分析会话
+
+        :param mode: "full"（cProfile + Chrome trace，结果总会保存）或
+                     "threshold"（栈采样，仅在超过延迟阈值时保存）
+        :param reason: 触发原因，写入产物索引中
+        :param driver: 开始时的 WebDriver 实例
+        :param categories: Chrome trace 类别
+        """
+        self.mode = mode
+        self.reason = reason
+        self.started_at = time.time()
+        self.profile = None
+        self.sampler = None
+        self.tracer = None
+        try:
+            driver.execute_cdp_cmd("Performance.enable", {})
+        except Exception as e:
+            logger.warning(f"启用 CDP Performance 失败: {e}")
+        try:
+            if mode == "full":
+                self.tracer = ChromeTracer(driver, categories)
+                if not self.tracer.start():
+                    logger.warning("Chrome trace 未能及时启动，本次仅保存 Python profile")
+                self.profile = cProfile.Profile()
+                self.profile.enable()
+            else:
+                self.sampler = StackSampler(threading.get_ident())
+                self.sampler.start()
+        except Exception:
+            # 部分启动失败时（如其他线程的 cProfile 仍在运行），停掉已启动的采集器
+            self._stop_collectors()
+            raise
+
+    def _stop_collectors(self):
+        if self.profile:
+            self.profile.disable()
+        if self.sampler and self.sampler._thread.is_alive():
+            self.sampler.stop()
+        if self.tracer and self.tracer._thread.is_alive():
+            self.tracer.stop()
+
+    def finish(self, driver, screenshot, threshold=0):
+        """
+        结束分析并保存产物到截图旁边
+
+        :param driver: 结束时的 WebDriver 实例（爬取过程中可能已重启）
+        :param screenshot: 本次截图路径，为空时以当前时间命名
+        :param threshold: 延迟阈值，threshold 模式下未超过则丢弃
+        :return: 产物索引 dict，未保存时返回 None
+        """
+        elapsed = time.time() - self.started_at
+        self._stop_collectors()
+        if self.mode == "threshold" and elapsed < threshold:
+            return None
+
+        base = os.path.splitext(screenshot)[0] if screenshot else os.path.join(config.SCREENSHOT_DIR, str(int(self.started_at)))
+        artifacts = {"reason": self.reason, "elapsed": round(elapsed, 3)}
+        try:
+            metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})
+            artifacts["metrics"] = f"{base}.metrics.json"
+            with open(artifacts["metrics"], "w", encoding="utf-8") as f:
+                json.dump(metrics, f)
+        except Exception as e:
+            logger.warning(f"获取 CDP Performance 指标失败: {e}")
+        if self.profile:
+            artifacts["python"] = f"{base}.prof"
+            self.profile.dump_stats(artifacts["python"])
+        if self.sampler:
+            artifacts["python"] = f"{base}.stacks.txt"
+            self.sampler.write(artifacts["python"])
+        if self.tracer and self.tracer.events:
+            artifacts["trace"] = f"{base}.trace.json"
+            self.tracer.write(artifacts["trace"])
+        logger.info(f"性能分析产物已保存（{self.reason}，耗时 {elapsed:.2f} 秒）: {base}.*")
+        return artifacts
+
+
+class CrawlProfiler:
+    def __init__(self, task_ids=None, sample_rate=config.PROFILE_SAMPLE_RATE,
+                 latency_threshold=config.PROFILE_LATENCY_THRESHOLD,
+                 trace_categories=config.PROFILE_TRACE_CATEGORIES):
+        """
+        决定哪些爬取需要性能分析
+
+        :param task_ids: 需要完整分析的任务 ID 集合，为空时读取 config.PROFILE_TASK_IDS
+        :param sample_rate: 随机抽样做完整分析的比例
+        :param latency_threshold: 延迟阈值（秒），其余爬取做低开销采样，超过阈值才保存
+        :param trace_categories: Chrome trace 类别
+        """
+        self.task_ids = task_ids if task_ids is not None else config.PROFILE_TASK_IDS
+        self.sample_rate = sample_rate
+        self.latency_threshold = latency_threshold
+        self.trace_categories = trace_categories
+
+    def _is_selected_task(self, url):
+        query = parse_qs(urlparse(url).query)
+        return any(value in self.task_ids for name in TASK_KEY_PARAMS for value in query.get(name, []))
+
+    def start(self, driver, url, force=False):
+        """
+        按配置开始一次分析会话
+
+        :param driver: WebDriver 实例
+        :param url: 目标 URL
+        :param force: 是否强制完整分析
+        :return: ProfileSession，无需分析或启动失败时返回 None（分析失败不影响爬取）
+        """
+        if force:
+            mode, reason = "full", "requested"
+        elif self.task_ids and self._is_selected_task(url):
+            mode, reason = "full", "task"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            mode, reason = "full", "sampled"
+        elif self.latency_threshold > 0:
+            mode, reason = "threshold", "slow"
+        else:
+            return None
+        try:
+            return ProfileSession(mode, reason, driver, self.trace_categories)
+        except Exception as e:
+            logger.error(f"启动性能分析失败，本次爬取不做分析: {e}")
+            return None
+
+    def finish(self, session, driver, screenshot):
+        """结束会话并保存产物，分析失败不影响爬取结果"""
+        try:
+            return session.finish(driver, screenshot, threshold=self.latency_threshold)
+        except Exception as e:
+            logger.error(f"保存性能分析产物失败: {e}")
+            return None
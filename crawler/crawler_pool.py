@@ -0,0 +1,59 @@
+# crawler/crawler_pool.py
+
+import queue
+import threading
+from contextlib import contextmanager
+from crawler.core_crawler import CoreCrawler
+from crawler.webdriver_mgr import WebDriverManager
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+
+class CrawlerPool:
+    def __init__(self, cookies_pool, size=1, rate_limiter=None, user_data_dir="./webdriver_data"):
+        """
+        预热一组 CoreCrawler，每个持有独立的浏览器实例，供多个线程复用
+
+        :param cookies_pool: 共享的 CookiesPool 实例
+        :param size: 浏览器实例数量
+        :param rate_limiter: RateLimiter 实例（可选）
+        :param user_data_dir: Chrome 用户数据目录，第 i 个实例（i > 0）使用 "{user_data_dir}_{i}"
+        """
+        self.cookies_pool = cookies_pool
+        self.size = size
+        self.crawlers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        for i in range(size):
+            data_dir = user_data_dir if i == 0 else f"{user_data_dir}_{i}"
+            logger.info(f"正在预热浏览器实例 {i + 1}/{size}")
+            crawler = CoreCrawler(WebDriverManager(user_data_dir=data_dir), cookies_pool, rate_limiter=rate_limiter)
+            self.crawlers.append(crawler)
+            self._idle.put(crawler)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """
+        借出一个空闲的 CoreCrawler，用完自动归还
+
+        :param timeout: 最长等待时间（秒），为空表示一直等待
+        :raises queue.Empty: 超时仍无空闲实例
+        """
+        crawler = self._idle.get(timeout=timeout)
+        try:
+            yield crawler
+        finally:
+            self._idle.put(crawler)
+
+    def status(self):
+        """返回池的当前状态"""
+        return {"size": self.size, "idle": self._idle.qsize()}
+
+    def quit(self):
+        """关闭所有浏览器实例"""
+        with self._lock:
+            for crawler in self.crawlers:
+                crawler.webdriver_manager.quit()
+            self.crawlers = []
+            logger.info("已关闭爬虫池中的全部浏览器")
@@ -10,10 +10,12 @@ from crawler.cookies_pool import CookiesPool
 logger = Logger(__name__).get_logger()
 
 class LoginHandler:
-    def __init__(self, webdriver_manager: WebDriverManager, cookies_pool: CookiesPool, login_url: str):
+    def __init__(self, webdriver_manager: WebDriverManager, cookies_pool: CookiesPool, login_url: str,
+                 qr_code_path: str = "qrcode.png"):
         self.webdriver_manager = webdriver_manager
         self.cookies_pool = cookies_pool
         self.login_url = login_url
+        self.qr_code_path = qr_code_path
         self.lock = Lock()
         self.is_logging_in = False
         self.qr_code = ""
@@ -52,7 +54,7 @@ class LoginHandler:
             elem = driver.find_element("css selector", ".qrcode-img")
             self.qr_code = elem.screenshot_as_base64  # 获取二维码图片的 base64 编码
             # 保存图片到本地
-            with open("qrcode.png", "wb") as f:
+            with open(self.qr_code_path, "wb") as f:
                 f.write(elem.screenshot_as_png)
 
             if not self.wait_for_qr_scan(driver, timeout):
@@ -0,0 +1,138 @@
+# crawler/login_manager.py
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import config
+from crawler.login_handler import LoginHandler
+from crawler.webdriver_mgr import WebDriverManager
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+
+class LoginSession:
+    def __init__(self, session_id, qr_code_path):
+        self.id = session_id
+        self.qr_code_path = qr_code_path
+        self.state = "starting"  # starting / waiting_scan / succeeded / failed
+        self.started_at = time.time()
+        self.handler = None
+        self.thread = None
+
+    def to_dict(self):
+        qr_code = self.handler.qr_code if self.handler else ""
+        state = "waiting_scan" if self.state == "starting" and qr_code else self.state
+        return {
+            "id": self.id,
+            "state": state,
+            "qr_code": qr_code,
+            "qr_code_path": self.qr_code_path,
+            "started_at": int(self.started_at),
+        }
+
+
+class LoginManager:
+    def __init__(self, cookies_pool, login_url=config.LOGIN_URL, max_sessions=config.LOGIN_MAX_SESSIONS,
+                 qr_dir=config.LOGIN_QR_DIR):
+        """
+        并行扫码登录：每个会话使用独立的轻量浏览器（临时用户目录、关闭性能日志）和独立的二维码文件，
+        登录成功的 cookies 直接加入 CookiesPool
+
+        :param cookies_pool: CookiesPool 实例
+        :param login_url: 登录页地址
+        :param max_sessions: 同时进行的会话上限
+        :param qr_dir: 二维码图片保存目录
+        """
+        self.cookies_pool = cookies_pool
+        self.login_url = login_url
+        self.max_sessions = max_sessions
+        self.qr_dir = qr_dir
+        self.sessions = {}
+        self._session_counter = 0
+        self._lock = threading.Lock()
+
+    def active_sessions(self):
+        with self._lock:
+            return [s for s in self.sessions.values() if s.state == "starting"]
+
+    def start_sessions(self, count=1, timeout=120):
+        """
+        启动若干个登录会话（受 max_sessions 限制）
+
+        :param count: 希望启动的会话数
+        :param timeout: 每个会话等待扫码的最大时间（秒）
+        :return: 实际启动的会话列表
+        """
+        os.makedirs(self.qr_dir, exist_ok=True)
+        started = []
+        with self._lock:
+            # 清理已结束的会话，只保留进行中的
+            self.sessions = {k: s for k, s in self.sessions.items() if s.state == "starting"}
+            active = len(self.sessions)
+            for _ in range(max(0, min(count, self.max_sessions - active))):
+                self._session_counter += 1
+                session_id = self._session_counter
+                session = LoginSession(session_id, os.path.join(self.qr_dir, f"qrcode_{session_id}.png"))
+                session.thread = threading.Thread(target=self._run, args=(session, timeout),
+                                                  name=f"login-{session_id}", daemon=True)
+                self.sessions[session_id] = session
+                started.append(session)
+        for session in started:
+            session.thread.start()
+        if started:
+            logger.info(f"已启动 {len(started)} 个登录会话")
+        else:
+            logger.warning(f"登录会话已达上限 {self.max_sessions}，未启动新会话")
+        return started
+
+    def refill(self, target, timeout=120):
+        """
+        按 cookies 池缺口启动登录会话
+
+        :param target: 期望的 cookies 数量
+        :return: 实际启动的会话列表
+        """
+        missing = target - len(self.cookies_pool.cookies_list) - len(self.active_sessions())
+        return self.start_sessions(missing, timeout=timeout) if missing > 0 else []
+
+    def _run(self, session, timeout):
+        user_data_dir = tempfile.mkdtemp(prefix=f"login_{session.id}_")
+        webdriver_manager = None
+        try:
+            webdriver_manager = WebDriverManager(user_data_dir=user_data_dir, performance_logging=False)
+            session.handler = LoginHandler(
+                webdriver_manager=webdriver_manager,
+                cookies_pool=self.cookies_pool,
+                login_url=self.login_url,
+                qr_code_path=session.qr_code_path
+            )
+            success = session.handler.start_login_process(timeout=timeout)
+            session.state = "succeeded" if success else "failed"
+        except Exception as e:
+            logger.error(f"登录会话 {session.id} 异常: {e}", exc_info=True)
+            session.state = "failed"
+        finally:
+            if webdriver_manager:
+                webdriver_manager.quit()
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            if os.path.exists(session.qr_code_path):
+                os.remove(session.qr_code_path)
+            logger.info(f"登录会话 {session.id} 结束，状态: {session.state}")
+
+    def wait(self, timeout=None):
+        """
+        等待所有会话结束
+
+        :return: 登录成功的会话数
+        """
+        for session in list(self.sessions.values()):
+            if session.thread:
+                session.thread.join(timeout)
+        return sum(1 for s in self.sessions.values() if s.state == "succeeded")
+
+    def status(self):
+        with self._lock:
+            return [s.to_dict() for s in self.sessions.values()]
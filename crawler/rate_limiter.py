@@ -0,0 +1,192 @@
+# crawler/rate_limiter.py
+
+import hashlib
+import time
+import config
+from dbh.redis_handler import RedisHandler
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+# 原子地对多个令牌桶补充令牌并尝试各取一个；任一桶不足时都不扣减，返回需要等待的秒数
+# KEYS: 令牌桶 key；ARGV[1]: 过期时间；之后每个 key 依次占用 initial, burst 两个参数
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local ttl = tonumber(ARGV[1])
+local wait = 0
+local states = {}
+for i, key in ipairs(KEYS) do
+    local initial = tonumber(ARGV[2 + (i - 1) * 2])
+    local burst = tonumber(ARGV[3 + (i - 1) * 2])
+    local s = redis.call('HMGET', key, 'tokens', 'ts', 'rate')
+    local rate = tonumber(s[3]) or initial
+    local tokens = tonumber(s[1]) or burst
+    local ts = tonumber(s[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    states[i] = {tokens, rate}
+end
+for i, key in ipairs(KEYS) do
+    local tokens = states[i][1]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(states[i][2]))
+    redis.call('EXPIRE', key, ttl)
+end
+return tostring(wait)
+"""
+
+# AIMD 调整速率：throttle 时乘性退避并清空令牌，success 连续达到窗口后加性增长
+# KEYS: 令牌桶 key；ARGV[1]: 模式；ARGV[2]: 过期时间；ARGV[3]: 成功窗口；ARGV[4]: 退避系数
+# 之后每个 key 依次占用 initial, min, max, step 四个参数
+_FEEDBACK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local mode = ARGV[1]
+local ttl = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local factor = tonumber(ARGV[4])
+for i, key in ipairs(KEYS) do
+    local base = 5 + (i - 1) * 4
+    local initial = tonumber(ARGV[base])
+    local lo = tonumber(ARGV[base + 1])
+    local hi = tonumber(ARGV[base + 2])
+    local step = tonumber(ARGV[base + 3])
+    local rate = tonumber(redis.call('HGET', key, 'rate')) or initial
+    if mode == 'throttle' then
+        rate = math.max(lo, rate * factor)
+        redis.call('HSET', key, 'rate', tostring(rate), 'streak', 0, 'tokens', 0, 'ts', tostring(now))
+    else
+        local streak = redis.call('HINCRBY', key, 'streak', 1)
+        if streak >= window then
+            rate = math.min(hi, rate + step)
+            redis.call('HSET', key, 'rate', tostring(rate), 'streak', 0)
+        end
+    end
+    redis.call('EXPIRE', key, ttl)
+end
+return 1
+"""
+
+
+def cookie_identity(cookie_entry):
+    """
+    计算 cookies 的稳定身份，用作限速 key
+
+    CookiesPool 的 ID 只是本进程内的计数器，不同主机上会重复；这里改用会话 cookie
+    内容（按 name 排序的 name=value）的哈希，同一登录身份在所有 worker 上共享同一个令牌桶
+
+    :param cookie_entry: CookiesPool 返回的 cookies 条目
+    :return: 身份字符串；没有 cookies（匿名访问）时返回 None，只按 host 限速，
+             否则所有匿名请求会共用同一个身份令牌桶
+    """
+    cookies = (cookie_entry or {}).get("cookies") or []
+    pairs = sorted(f"{c.get('name')}={c.get('value')}" for c in cookies if isinstance(c, dict))
+    if not pairs:
+        return None
+    return hashlib.sha1("; ".join(pairs).encode("utf-8")).hexdigest()[:16]
+
+
+class RateLimiter:
+    def __init__(self, redis_handler=None, limits=None, prefix=config.RATE_LIMIT_PREFIX,
+                 success_window=config.RATE_LIMIT_SUCCESS_WINDOW,
+                 backoff_factor=config.RATE_LIMIT_BACKOFF_FACTOR, key_ttl=3600):
+        """
+        基于 Redis 的自适应令牌桶限速器，按 cookies 身份和目标 host 两个维度同时限速
+
+        :param redis_handler: RedisHandler 实例，为空时自动创建
+        :param limits: 各维度参数，格式同 config.RATE_LIMITS
+        :param prefix: Redis key 前缀
+        :param success_window: 连续成功多少次后加性提速一次
+        :param backoff_factor: 遇到限流信号时的乘性退避系数
+        :param key_ttl: 令牌桶 key 的过期时间（秒），长期不用的身份自动清理
+        """
+        self.redis = redis_handler or RedisHandler()
+        self.limits = limits or config.RATE_LIMITS
+        self.prefix = prefix
+        self.success_window = success_window
+        self.backoff_factor = backoff_factor
+        self.key_ttl = key_ttl
+        self._acquire = self.redis.client.register_script(_ACQUIRE_SCRIPT)
+        self._feedback = self.redis.client.register_script(_FEEDBACK_SCRIPT)
+
+    def _buckets(self, cookie_id, host):
+        buckets = []
+        if cookie_id is not None:
+            buckets.append(("cookie", f"{self.prefix}:cookie:{cookie_id}"))
+        if host:
+            buckets.append(("host", f"{self.prefix}:host:{host}"))
+        return buckets
+
+    def acquire(self, cookie_id=None, host=None, timeout=None):
+        """
+        阻塞直到 cookies 身份和 host 的令牌桶都有可用令牌
+
+        :param cookie_id: cookies 身份（见 cookie_identity），为空则不按身份限速
+        :param host: 目标 host，为空则不按 host 限速
+        :param timeout: 最长等待时间（秒），为空表示一直等待
+        :return: 是否成功获取令牌；Redis 不可用时放行并返回 True
+        """
+        buckets = self._buckets(cookie_id, host)
+        if not buckets:
+            return True
+        keys = [key for _, key in buckets]
+        args = [self.key_ttl]
+        for kind, _ in buckets:
+            args += [self.limits[kind]["initial"], self.limits[kind]["burst"]]
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            try:
+                wait = float(self._acquire(keys=keys, args=args))
+            except Exception as e:
+                logger.warning(f"限速器访问 Redis 失败，本次直接放行: {e}")
+                return True
+            if wait <= 0:
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                logger.warning(f"等待令牌超时: cookie={cookie_id}, host={host}")
+                return False
+            logger.info(f"触发限速，等待 {wait:.2f} 秒: cookie={cookie_id}, host={host}")
+            time.sleep(wait)
+
+    def record_success(self, cookie_id=None, host=None):
+        """记录一次成功请求，连续成功达到窗口后提速"""
+        self._record("success", cookie_id, host)
+
+    def record_throttle(self, cookie_id=None, host=None):
+        """
+        记录一次限流信号，立即退避。只与某个 cookies 有关的信号（如被重定向到登录页）
+        应只传 cookie_id，避免拖慢整个 host 的速率
+        """
+        logger.warning(f"检测到限流信号，降低请求速率: cookie={cookie_id}, host={host}")
+        self._record("throttle", cookie_id, host)
+
+    def _record(self, mode, cookie_id, host):
+        buckets = self._buckets(cookie_id, host)
+        if not buckets:
+            return
+        keys = [key for _, key in buckets]
+        args = [mode, self.key_ttl, self.success_window, self.backoff_factor]
+        for kind, _ in buckets:
+            limit = self.limits[kind]
+            args += [limit["initial"], limit["min"], limit["max"], limit["step"]]
+        try:
+            self._feedback(keys=keys, args=args)
+        except Exception as e:
+            logger.warning(f"限速器更新速率失败: {e}")
+
+    def get_rates(self, cookie_id=None, host=None):
+        """
+        查询当前各令牌桶的速率
+
+        :return: {key: 速率（请求数/秒）}
+        """
+        rates = {}
+        for kind, key in self._buckets(cookie_id, host):
+            rate = self.redis.client.hget(key, "rate")
+            rates[key] = float(rate) if rate is not None else self.limits[kind]["initial"]
+        return rates
@@ -0,0 +1,126 @@
+# crawler/result_cache.py
+
+from urllib.parse import urlparse, parse_qs
+import config
+from dbh.redis_handler import RedisHandler
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+TASK_KEY_PARAMS = ("encryptMockTaskNo", "voteTaskNo")
+
+
+def task_key_from_url(url):
+    """
+    从分享链接中提取任务 ID，优先 encryptMockTaskNo，其次 voteTaskNo
+
+    :param url: 分享链接
+    :return: 形如 "encryptMockTaskNo:xxx" 的 key，链接中没有任务 ID 时返回 None
+    """
+    query = parse_qs(urlparse(url).query)
+    for name in TASK_KEY_PARAMS:
+        if query.get(name):
+            return f"{name}:{query[name][0]}"
+    return None
+
+
+class ResultCache:
+    def __init__(self, redis_handler=None, prefix=config.RESULT_CACHE_PREFIX,
+                 success_ttl=config.RESULT_CACHE_SUCCESS_TTL, failure_ttl=config.RESULT_CACHE_FAILURE_TTL):
+        """
+        爬取结果缓存，成功结果和永久失败（如错误链接）分别使用不同的 TTL
+
+        :param redis_handler: RedisHandler 实例，为空时自动创建
+        :param prefix: Redis key 前缀
+        :param success_ttl: 成功结果的缓存时间（秒）
+        :param failure_ttl: 永久失败的缓存时间（秒）
+        """
+        self.redis = redis_handler or RedisHandler()
+        self.prefix = prefix
+        self.success_ttl = success_ttl
+        self.failure_ttl = failure_ttl
+        self.stats_key = f"{prefix}:stats"
+
+    def _key(self, task_key):
+        return f"{self.prefix}:{task_key}"
+
+    def _count(self, field):
+        try:
+            self.redis.incr_hash(self.stats_key, field)
+        except Exception as e:
+            logger.warning(f"更新缓存统计失败: {e}")
+
+    def get(self, url):
+        """
+        查询缓存
+
+        :param url: 分享链接
+        :return: {"status": "ok", "detail": ..., "comment": ...} 或 {"status": "wrong link"}，未命中返回 None
+        """
+        task_key = task_key_from_url(url)
+        if not task_key:
+            return None
+        try:
+            entry = self.redis.get_json(self._key(task_key))
+        except Exception as e:
+            logger.warning(f"读取结果缓存失败: {e}")
+            return None
+        if entry is None:
+            self._count("misses")
+            return None
+        self._count("hits" if entry.get("status") == "ok" else "negative_hits")
+        logger.info(f"命中结果缓存: {task_key[:32]}, 状态: {entry.get('status')}")
+        return entry
+
+    def get_or_crawl(self, url, crawl):
+        """
+        先查缓存，未命中时调用 crawl(url) 实际爬取，并按结果写回缓存
+
+        :param url: 分享链接
+        :param crawl: 可调用对象，返回 (detail, comment)
+        :return: (detail, comment)，错误链接时 detail 为 "wrong link"
+        """
+        cached = self.get(url)
+        if cached:
+            if cached["status"] == "ok":
+                return cached["detail"], cached["comment"]
+            return cached["status"], []
+        detail, comment = crawl(url)
+        if detail == "wrong link":
+            self.set_failure(url)
+        elif isinstance(detail, dict):
+            self.set_success(url, detail, comment)
+        return detail, comment
+
+    def set_success(self, url, detail, comment):
+        """缓存成功结果，同时以 voteTaskNo 建立索引"""
+        entry = {"status": "ok", "detail": detail, "comment": comment}
+        keys = {task_key_from_url(url)}
+        vote_task_no = (detail.get("taskInfo") or {}).get("voteTaskNo") if isinstance(detail, dict) else None
+        if vote_task_no:
+            keys.add(f"voteTaskNo:{vote_task_no}")
+        for task_key in keys - {None}:
+            self._set(task_key, entry, self.success_ttl)
+
+    def set_failure(self, url, reason="wrong link"):
+        """缓存永久失败，避免相同链接再次占用浏览器"""
+        task_key = task_key_from_url(url)
+        if task_key:
+            self._set(task_key, {"status": reason}, self.failure_ttl)
+
+    def _set(self, task_key, entry, ttl):
+        try:
+            self.redis.set_json(self._key(task_key), entry, ex=ttl)
+        except Exception as e:
+            logger.warning(f"写入结果缓存失败: {e}")
+
+    def stats(self):
+        """
+        返回命中统计：hits（成功命中）、negative_hits（失败命中）、misses
+        """
+        try:
+            raw = self.redis.get_hash(self.stats_key)
+        except Exception as e:
+            logger.warning(f"读取缓存统计失败: {e}")
+            raw = {}
+        return {field: int(raw.get(field, 0)) for field in ("hits", "negative_hits", "misses")}
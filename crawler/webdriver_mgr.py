@@ -3,6 +3,7 @@
 import undetected_chromedriver as uc
 from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.service import Service
+import threading
 import time
 import logging
 from utils.logger import Logger
@@ -10,9 +11,19 @@ import config
 
 logger = Logger(__name__).get_logger()
 
+# undetected_chromedriver 启动时会修补驱动文件，进程内所有浏览器（爬虫池、登录会话、重启）只能依次启动
+_driver_start_lock = threading.Lock()
+
 class WebDriverManager:
-    def __init__(self, options=None, wire_options=None, retry_limit=3, retry_delay=5):
+    def __init__(self, options=None, wire_options=None, retry_limit=3, retry_delay=5, user_data_dir="./webdriver_data",
+                 performance_logging=True):
+        """
+        :param user_data_dir: Chrome 用户数据目录，同时运行多个浏览器时必须各不相同
+        :param performance_logging: 是否开启性能日志（爬取依赖它获取接口响应，登录等场景可关闭以减少开销）
+        """
         self.wire_options = wire_options or {}
+        self.user_data_dir = user_data_dir
+        self.performance_logging = performance_logging
         self.retry_limit = retry_limit
         self.retry_delay = retry_delay
         self.driver = None
@@ -27,7 +38,8 @@ class WebDriverManager:
     def _default_options(self):
         wechat_ua = self.wechat_ua
         chrome_options = uc.ChromeOptions()
-        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        if self.performance_logging:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         chrome_options.add_argument('--user-agent=' + wechat_ua)
         chrome_options.add_argument('--disable-gpu')  # 禁用 GPU 硬件加速
         chrome_options.add_argument('--no-sandbox')  # 禁用 GPU 硬件加速
@@ -35,7 +47,7 @@ class WebDriverManager:
         chrome_options.add_argument("--window-size=1290,2796")
         chrome_options.add_argument('--disable-extensions')
         chrome_options.add_argument('--disable-notifications')
-        chrome_options.add_argument(r'--user-data-dir=./webdriver_data')  # 指定用户数据目录
+        chrome_options.add_argument(f'--user-data-dir={self.user_data_dir}')  # 指定用户数据目录
         chrome_options.add_argument('--disable-features=TranslateUI,BrowserSwitcherService')
         chrome_options.add_argument('--disable-autoupdate')
         return chrome_options
@@ -45,7 +57,8 @@ class WebDriverManager:
         for attempt in range(1, self.retry_limit + 1):
             try:
                 logger.info(f"正在启动 WebDriver...{config.CHROME_DRIVER_PATH}")
-                self.driver = uc.Chrome(driver_executable_path=config.CHROME_DRIVER_PATH, options=self._default_options(), version_main=138, seleniumwire_options=self.wire_options)
+                with _driver_start_lock:
+                    self.driver = uc.Chrome(driver_executable_path=config.CHROME_DRIVER_PATH, options=self._default_options(), version_main=138, seleniumwire_options=self.wire_options)
                 print(self.driver.capabilities['browserVersion'])  # 输出 Chromium 版本
                 print(self.driver.capabilities['chrome']['chromedriverVersion'])  # 输出驱动版本
                 self.driver.execute_cdp_cmd("Network.enable", {})
@@ -71,11 +84,7 @@ class WebDriverManager:
                 logger.info("WebDriver 启动成功")
                 return
             except Exception as e:
-                logger.error(f"启动 WebDriver 失败 (尝试 {attempt}/{self.retry_limit}): {e}")
-                # get lineno
-                import traceback
-                exc_info = traceback.format_exc()
-                logger.error(f"异常信息: {exc_info}")
+                logger.error(f"启动 WebDriver 失败 (尝试 {attempt}/{self.retry_limit}): {e}", exc_info=True)
                 if attempt < self.retry_limit:
                     time.sleep(self.retry_delay)
                 else:
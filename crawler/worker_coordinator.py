@@ -0,0 +1,138 @@
+# crawler/worker_coordinator.py
+
+import os
+import signal
+import socket
+import threading
+import uuid
+import config
+from dbh.redis_handler import RedisHandler
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+
+class WorkerCoordinator:
+    def __init__(self, queue_key, redis_handler=None, worker_id=None, prefix=config.WORKER_PREFIX,
+                 heartbeat_interval=config.WORKER_HEARTBEAT_INTERVAL, heartbeat_ttl=config.WORKER_HEARTBEAT_TTL):
+        """
+        基于 Redis 的多节点 worker 协调：注册与心跳、任务租约、失联 worker 的任务回收、优雅退出
+
+        每个 worker 从队列领取任务时原子地把任务移入自己的 processing 列表（即租约），
+        完成后删除，失败后放回队尾。worker 心跳过期后，其他 worker 会把它 processing
+        列表中的任务放回队头。
+
+        :param queue_key: 任务队列 key
+        :param redis_handler: RedisHandler 实例，为空时自动创建
+        :param worker_id: worker 标识，为空时使用 "主机名:进程号:随机串"
+        :param prefix: Redis key 前缀
+        :param heartbeat_interval: 心跳间隔（秒）
+        :param heartbeat_ttl: 心跳过期时间（秒）
+        """
+        self.queue_key = queue_key
+        self.redis = redis_handler or RedisHandler()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.prefix = prefix
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_ttl = heartbeat_ttl
+        self.registry_key = f"{prefix}:registry"
+        self.processing_key = self._processing_key(self.worker_id)
+        self._drain_event = threading.Event()  # 收到退出信号：不再领取新任务，但心跳继续
+        self._stop_event = threading.Event()  # release() 时停止心跳
+        self._heartbeat_thread = None
+
+    def _processing_key(self, worker_id):
+        return f"{self.prefix}:processing:{worker_id}"
+
+    def _heartbeat_key(self, worker_id):
+        return f"{self.prefix}:heartbeat:{worker_id}"
+
+    @property
+    def stopping(self):
+        """是否已收到退出信号"""
+        return self._drain_event.is_set()
+
+    def wait(self, seconds):
+        """可被退出信号打断的 sleep，返回是否收到退出信号"""
+        return self._drain_event.wait(seconds)
+
+    def start(self):
+        """注册 worker，回收失联 worker 的任务，并启动后台心跳线程"""
+        self._heartbeat()
+        logger.info(f"Worker 已注册: {self.worker_id}")
+        self.reclaim_dead_workers()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        # 每次心跳都重新注册：即使因 Redis 短暂不可用被其他 worker 移出注册表，也能恢复
+        self.redis.client.set(self._heartbeat_key(self.worker_id), 1, ex=self.heartbeat_ttl)
+        self.redis.client.sadd(self.registry_key, self.worker_id)
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            try:
+                self._heartbeat()
+                self.reclaim_dead_workers()
+            except Exception as e:
+                logger.error(f"发送心跳失败: {e}")
+
+    def install_signal_handlers(self):
+        """SIGTERM / SIGINT 时只设置退出标记，由主循环处理完当前任务后退出"""
+        def handler(signum, frame):
+            logger.warning(f"收到信号 {signum}，处理完当前任务后退出")
+            self._drain_event.set()
+
+        signal.signal(signal.SIGTERM, handler)
+        signal.signal(signal.SIGINT, handler)
+
+    def claim(self):
+        """
+        从队头领取一个任务，并持有其租约
+
+        :return: 原始任务数据，队列为空时返回 None
+        """
+        return self.redis.move_queue_item(self.queue_key, self.processing_key, "LEFT", "RIGHT")
+
+    def complete(self, raw):
+        """任务处理完毕（包括确认需丢弃的任务），释放租约"""
+        self.redis.remove_queue_item(self.processing_key, raw)
+
+    def requeue(self, raw):
+        """任务处理失败，释放租约并放回队尾"""
+        pipe = self.redis.client.pipeline(transaction=True)
+        pipe.lrem(self.processing_key, 1, raw)
+        pipe.rpush(self.queue_key, raw)
+        pipe.execute()
+
+    def _return_leases(self, worker_id):
+        """把某个 worker 持有的全部任务按原顺序放回队头"""
+        processing_key = self._processing_key(worker_id)
+        count = 0
+        while self.redis.move_queue_item(processing_key, self.queue_key, "RIGHT", "LEFT") is not None:
+            count += 1
+        return count
+
+    def reclaim_dead_workers(self):
+        """回收心跳已过期的 worker 所持有的任务"""
+        for member in self.redis.client.smembers(self.registry_key):
+            worker_id = member.decode("utf-8") if isinstance(member, bytes) else member
+            if worker_id == self.worker_id or self.redis.client.exists(self._heartbeat_key(worker_id)):
+                continue
+            count = self._return_leases(worker_id)
+            self.redis.client.srem(self.registry_key, worker_id)
+            logger.warning(f"Worker {worker_id} 已失联，回收 {count} 个任务")
+
+    def release(self):
+        """停止心跳，归还自己持有的全部任务并注销"""
+        self._drain_event.set()
+        self._stop_event.set()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join(timeout=self.heartbeat_interval)
+        try:
+            count = self._return_leases(self.worker_id)
+            self.redis.client.delete(self._heartbeat_key(self.worker_id))
+            self.redis.client.srem(self.registry_key, self.worker_id)
+            logger.info(f"Worker 已注销: {self.worker_id}，归还 {count} 个任务")
+        except Exception as e:
+            logger.error(f"注销 worker 失败: {e}")
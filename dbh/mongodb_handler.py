@@ -1,4 +1,13 @@
-from pymongo import MongoClient
+import threading
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, CursorNotFound
+from utils.logger import Logger
+
+logger = Logger(__name__).get_logger()
+
+# 唯一索引冲突：并发 upsert 时另一方已插入，等同于文档已存在
+_DUPLICATE_KEY = 11000
 
 class MongoDBHandler:
     def __init__(self, conn_str, db_name):
@@ -12,5 +21,120 @@ class MongoDBHandler:
         res = self.db[collection].find(filter_cond)
         return [{**doc, '_id': str(doc['_id'])} for doc in res]
     
+    def iter_documents(self, collection, filter_cond=None, projection=None, batch_size=1000, after_id=None):
+        """
+        按 _id 升序流式读取文档，内存占用与结果集大小无关
+
+        :param collection: 集合名
+        :param filter_cond: 查询条件
+        :param projection: 字段投影
+        :param batch_size: 每次从服务器拉取的文档数
+        :param after_id: 从该 _id 之后继续读取（ObjectId 或其字符串），用于断点续读
+        :return: 文档生成器（_id 保持原始类型）
+        """
+        if isinstance(after_id, str) and ObjectId.is_valid(after_id):
+            after_id = ObjectId(after_id)
+        while True:
+            query = dict(filter_cond or {})
+            if after_id is not None:
+                query = {"$and": [query, {"_id": {"$gt": after_id}}]} if query else {"_id": {"$gt": after_id}}
+            cursor = self.db[collection].find(query, projection).sort("_id", ASCENDING).batch_size(batch_size)
+            try:
+                for doc in cursor:
+                    after_id = doc["_id"]
+                    yield doc
+                return
+            except CursorNotFound:
+                # 游标在服务端超时，从最后读到的 _id 继续
+                continue
+            finally:
+                cursor.close()
+
+    def iter_chunks(self, collection, filter_cond=None, projection=None, batch_size=1000, chunk_size=10000, after_id=None):
+        """
+        流式读取并按 chunk_size 分块
+
+        :return: 文档列表生成器，每块最多 chunk_size 条
+        """
+        chunk = []
+        for doc in self.iter_documents(collection, filter_cond, projection, batch_size, after_id):
+            chunk.append(doc)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
     def update_document(self, collection, filter_cond, update_data):
         self.db[collection].update_one(filter_cond, update_data)
+
+
+class MongoBatchWriter:
+    def __init__(self, collection, key="raw_url", batch_size=100):
+        """
+        缓冲写入：按 key 去重，已存在的文档不覆盖，攒够 batch_size 条后一次 bulk_write
+
+        :param collection: pymongo Collection
+        :param key: 去重字段
+        :param batch_size: 每批写入的文档数
+        """
+        self.collection = collection
+        self.key = key
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.skipped = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def write(self, doc):
+        """
+        加入一条文档，缓冲满时自动写入。写入失败的文档留在缓冲中，下次写入时重试，
+        因此这里不抛出异常
+        """
+        with self._lock:
+            self._buffer.append(UpdateOne({self.key: doc[self.key]}, {"$setOnInsert": doc}, upsert=True))
+            if len(self._buffer) >= self.batch_size:
+                try:
+                    self._flush_locked()
+                except Exception as e:
+                    logger.error(f"批量写入失败，{len(self._buffer)} 条文档留在缓冲中等待重试: {e}")
+
+    def flush(self):
+        """立即写入缓冲中的全部文档"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """写入缓冲；失败时只把未写入的操作放回缓冲，然后重新抛出异常"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            result = self.collection.bulk_write(batch, ordered=False)
+        except BulkWriteError as e:
+            # ordered=False 时其余操作已执行，只保留出错的操作
+            details = e.details
+            self.inserted += details.get("nUpserted", 0)
+            self.skipped += details.get("nMatched", 0)
+            for error in details.get("writeErrors", []):
+                if error.get("code") == _DUPLICATE_KEY:
+                    self.skipped += 1
+                else:
+                    self._buffer.append(batch[error["index"]])
+            if self._buffer:
+                raise
+            return
+        except Exception:
+            self._buffer = batch + self._buffer
+            raise
+        self.inserted += result.upserted_count
+        self.skipped += result.matched_count
+
+    @property
+    def pending(self):
+        """仍在缓冲中（尚未成功写入）的文档数"""
+        return len(self._buffer)
+
+    def close(self):
+        """写入剩余文档，仍失败时抛出异常，未写入的条数见 pending"""
+        self.flush()
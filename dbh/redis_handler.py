@@ -1,5 +1,5 @@
 import redis
-import json
+from utils import codec
 import config
 
 class RedisHandler:
@@ -8,12 +8,20 @@ class RedisHandler:
 
     def set_json(self, key, value, ex=None):
         """存储 JSON 数据"""
-        self.client.set(key, json.dumps(value), ex=ex)
+        self.client.set(key, codec.dumpb(value), ex=ex)
 
     def get_json(self, key):
         """获取 JSON 数据"""
         data = self.client.get(key)
-        return json.loads(data) if data else None
+        return codec.loads(data) if data else None
+
+    def incr_hash(self, key, field, amount=1):
+        """哈希字段自增"""
+        return self.client.hincrby(key, field, amount)
+
+    def get_hash(self, key):
+        """获取整个哈希，键值均解码为字符串"""
+        return {k.decode('utf-8'): v.decode('utf-8') for k, v in self.client.hgetall(key).items()}
 
     def delete(self, key):
         """删除键值"""
@@ -30,3 +38,11 @@ class RedisHandler:
     def push_queue_tail(self, key, value):
         """插入元素到队尾"""
         return self.client.rpush(key, value)
+
+    def move_queue_item(self, src, dst, src_side="LEFT", dst_side="RIGHT"):
+        """原子地从 src 一端弹出元素并压入 dst 一端，返回该元素"""
+        return self.client.lmove(src, dst, src_side, dst_side)
+
+    def remove_queue_item(self, key, value, count=1):
+        """从队列中删除指定元素"""
+        return self.client.lrem(key, count, value)
@@ -0,0 +1,157 @@
+import os
+import sys
+from datetime import datetime
+from bson import ObjectId
+import config
+from utils import codec
+from dbh.mongodb_handler import MongoDBHandler
+
+# 题目集合的已知字段，Parquet 导出时始终保留这些列（即使前几块文档中没有）
+PARQUET_COLUMNS = ("_id", "raw_url", "userId", "taskId", "uploader", "upload_timestamp", "detail", "comment")
+
+
+def _to_jsonable(value):
+    """ObjectId、datetime 等 BSON 类型转换为字符串"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _flatten_row(doc, columns):
+    """
+    Parquet 行：每个字段占一列且均为字符串，嵌套的 dict / list 编码为 JSON 字符串，
+    标量转为字符串（同一字段可能混有 int / str，如 uploader、userId），保证各块 schema 一致
+
+    :param columns: 输出的列名
+    """
+    row = {}
+    for key in columns:
+        value = doc.get(key)
+        if value is None:
+            row[key] = None
+        elif isinstance(value, (dict, list)):
+            row[key] = codec.dumps(value, default=_to_jsonable)
+        elif isinstance(value, str):
+            row[key] = value
+        else:
+            row[key] = _to_jsonable(value)
+    return row
+
+
+def export_ndjson(chunks, output, append=False):
+    """
+    逐块写出 NDJSON
+
+    :param chunks: iter_chunks 返回的文档块生成器
+    :param output: 输出文件路径，"-" 表示 stdout
+    :param append: 是否追加写入（断点续导时使用）
+    :return: (导出条数, 最后一条的 _id)
+    """
+    f = sys.stdout.buffer if output == "-" else open(output, "ab" if append else "wb")
+    total, last_id = 0, None
+    try:
+        for chunk in chunks:
+            f.write(b"".join(codec.dumpb(doc, default=_to_jsonable) + b"\n" for doc in chunk))
+            f.flush()
+            total += len(chunk)
+            last_id = chunk[-1]["_id"]
+            print(f"已导出 {total} 条，最后 _id: {last_id}", file=sys.stderr)
+    finally:
+        if f is not sys.stdout.buffer:
+            f.close()
+    return total, last_id
+
+
+def export_parquet(chunks, output, columns=None):
+    """
+    逐块写出 Parquet，每块一个 row group，所有列均为字符串类型
+
+    列为 columns（为空时使用 PARQUET_COLUMNS）加上第一块中出现的其他字段；
+    之后才出现的字段无法加入已写出的 schema，会在 stderr 中提示
+
+    :param chunks: iter_chunks 返回的文档块生成器
+    :param output: 输出文件路径
+    :param columns: 输出的列名
+    :return: (导出条数, 最后一条的 _id)
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("导出 Parquet 需要安装 pyarrow：pip install pyarrow")
+
+    writer = None
+    names = None
+    unknown = set()
+    total, last_id = 0, None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                names = list(columns or PARQUET_COLUMNS)
+                for doc in chunk:
+                    names.extend(key for key in doc if key not in names)
+                schema = pa.schema([(name, pa.string()) for name in names])
+                writer = pq.ParquetWriter(output, schema)
+            else:
+                extra = {key for doc in chunk for key in doc if key not in names} - unknown
+                if extra:
+                    unknown |= extra
+                    print(f"以下字段不在 Parquet 列定义中，已忽略: {sorted(extra)}", file=sys.stderr)
+            rows = [_flatten_row(doc, names) for doc in chunk]
+            writer.write_table(pa.Table.from_pylist(rows, schema=writer.schema))
+            total += len(chunk)
+            last_id = chunk[-1]["_id"]
+            print(f"已导出 {total} 条，最后 _id: {last_id}", file=sys.stderr)
+    finally:
+        if writer:
+            writer.close()
+    return total, last_id
+
+
+def parquet_part_path(output, after_id):
+    """
+    断点续导时 Parquet 无法追加写入，改为写出新的分片文件 "<output 去掉扩展名>.after-<after_id>.parquet"
+    """
+    base, ext = os.path.splitext(output)
+    return f"{base}.after-{after_id}{ext or '.parquet'}"
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="流式导出 MongoDB 集合")
+    parser.add_argument("output", help="输出文件路径，NDJSON 格式下 - 表示 stdout")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    parser.add_argument("--collection", default=config.PROBLEM_COLLECTION)
+    parser.add_argument("--filter", default="{}", help="JSON 格式的查询条件")
+    parser.add_argument("--fields", help="逗号分隔的导出字段，默认全部")
+    parser.add_argument("--batch-size", type=int, default=config.EXPORT_BATCH_SIZE)
+    parser.add_argument("--chunk-size", type=int, default=config.EXPORT_CHUNK_SIZE)
+    parser.add_argument("--after-id", help="从该 _id 之后继续导出：NDJSON 追加写入 output；"
+                                           "Parquet 不修改 output，另写分片文件 <output 去掉扩展名>.after-<id>.parquet")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    projection = {field: 1 for field in args.fields.split(",")} if args.fields else None
+    handler = MongoDBHandler(config.MONGO_CONN, config.DB_NAME)
+    chunks = handler.iter_chunks(
+        args.collection,
+        filter_cond=codec.loads(args.filter),
+        projection=projection,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        after_id=args.after_id,
+    )
+    if args.format == "parquet":
+        output = parquet_part_path(args.output, args.after_id) if args.after_id else args.output
+        if args.after_id and os.path.exists(output):
+            raise SystemExit(f"分片文件已存在，拒绝覆盖: {output}")
+        columns = ["_id"] + [f for f in args.fields.split(",") if f != "_id"] if args.fields else None
+        total, last_id = export_parquet(chunks, output, columns=columns)
+        print(f"Parquet 已写入: {output}", file=sys.stderr)
+    else:
+        total, last_id = export_ndjson(chunks, args.output, append=bool(args.after_id))
+    print(f"导出完成，共 {total} 条，最后 _id: {last_id}", file=sys.stderr)
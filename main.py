@@ -3,13 +3,16 @@ from datetime import datetime
 from dbh.redis_handler import RedisHandler
 import undetected_chromedriver as uc
 import config
-import json
 from crawler.core_crawler import CoreCrawler
 from crawler.webdriver_mgr import WebDriverManager
 from crawler.cookies_pool import CookiesPool
 from crawler.login_handler import LoginHandler
+from crawler.rate_limiter import RateLimiter
+from crawler.result_cache import ResultCache
+from crawler.worker_coordinator import WorkerCoordinator
 from pymongo import MongoClient
-from utils.logger import Logger
+from utils.logger import Logger, set_task_id
+from utils.codec import decode_queue_item
 
 logger = Logger(__name__).get_logger()
 
@@ -18,11 +21,15 @@ REDIS_QUEUE = 'upload_queue'
 
 # Connect to Redis using the handler
 r = RedisHandler()
+result_cache = ResultCache(r) if config.RESULT_CACHE_ENABLED else None
 
-def get_content(url, crawler):
-    # Your insert logic here
+def get_content(url, crawl, cache=None):
+    # crawl(url) -> (detail, comment)，只在缓存未命中时调用
     try:
-        res = crawler.crawl_page(url, retry=2)
+        if cache:
+            res = cache.get_or_crawl(url, crawl)
+        else:
+            res = crawl(url)
         if len(res) == 2:
             detail, comment = res
         if detail == "wrong link":
@@ -53,13 +60,14 @@ def upsert_item(col, item):
         col.insert_one(item)
         logger.info("Inserted new item with voteTaskNo")
 
-def process_queue():
-    while True:
+def process_queue(coordinator):
+    while not coordinator.stopping:
         now = datetime.now()
         # Wait until the start of the next minute
         sleep_seconds = (60 - now.second) % 30
         print(f"Waiting for {sleep_seconds} seconds until the next minute...")
-        time.sleep(sleep_seconds)
+        if coordinator.wait(sleep_seconds):
+            break
 
         # Read all items from the queue
         queue_items = r.get_queue(REDIS_QUEUE)
@@ -69,39 +77,58 @@ def process_queue():
             # Initialize WebDriverManager and CookiesPool
             cookies_pool = None
             webdriver_manager = None
+            crawler = None
+            crawled_urls = set()
+
+            def crawl(u, profile=False):
+                # 只有缓存未命中时才启动浏览器，整批缓存命中时不启动 Chrome
+                nonlocal webdriver_manager, crawler
+                if crawler is None:
+                    webdriver_manager = WebDriverManager()
+                    rate_limiter = RateLimiter(r) if config.RATE_LIMIT_ENABLED else None
+                    crawler = CoreCrawler(webdriver_manager, cookies_pool, rate_limiter=rate_limiter)
+                crawled_urls.add(u)
+                return crawler.crawl_page(u, retry=2, profile=profile)
+
             try:
-                webdriver_manager = WebDriverManager()
                 cookies_pool = CookiesPool(max_size=100)
-                crawler = CoreCrawler(webdriver_manager, cookies_pool)
                 coll = MongoClient(config.MONGO_CONN)[config.DB_NAME][config.PROBLEM_COLLECTION]
                 process_cnt = min(len(queue_items), 8)  # Process up to 8 items
                 logger.info(f"Current patch process count: {process_cnt}")
                 for _ in range(process_cnt):
-                    raw = r.pop_queue_head(REDIS_QUEUE)
+                    if coordinator.stopping:
+                        logger.info("Shutdown requested, not claiming more items")
+                        break
+                    set_task_id(None)
+                    # Claim the head item and hold its lease until it is completed or requeued
+                    raw = coordinator.claim()
+                    if not raw:
+                        break
+                    failed = False
                     try:
-                    # decode if it is json, otherwise continue
-                        if not raw:
-                            continue
-                        data = None
-                        try:
-                            raw = raw.decode('utf-8') if isinstance(raw, bytes) else raw
-                            data = json.loads(raw)
-                        except (json.JSONDecodeError, UnicodeDecodeError):
-                            continue
-                        if isinstance(data, dict) and 'userId' in data and 'taskId' in data:
-                            userId = data['userId']
-                            taskId = data['taskId']
+                    # decode against the queue message schema, skip malformed items
+                        item = decode_queue_item(raw)
+                        if item is not None:
+                            userId = item.userId
+                            taskId = item.taskId
+                            set_task_id(taskId)
                             logger.info(f"Processing item: userId={userId}, taskId={taskId[:7]}...")
-                            uploader = data.get('uploader', 'unknown')
+                            uploader = item.uploader
                             existing_doc = coll.find_one({"userId": userId, "taskId": taskId})
                             if existing_doc:
                                 continue
                             url = f"https://zqt.meituan.com/xiaomei/vote/jury/api/r/rediectByScene?jumpScene=mockTaskShare&userId={userId}&channel=mockTaskShare&encryptMockTaskNo={taskId}"
-                            res = get_content(url, crawler)
+                            if item.profile:
+                                # 需要性能分析的任务跳过缓存，保证实际爬取一次
+                                res = get_content(url, lambda u: crawl(u, profile=True))
+                            else:
+                                res = get_content(url, crawl, cache=result_cache)
                             if res == "wrong link":
                                 logger.error(f"Wrong link for URL: {url}")
-                                with open("wrong_links.txt", "a") as f:
-                                    f.write(f"{userId}, {taskId}\n")
+                                # 缓存命中的错误链接此前已记录过，只记录本次实际爬取得到的
+                                if url in crawled_urls:
+                                    with open("wrong_links.txt", "a") as f:
+                                        f.write(f"{userId}, {taskId}\n")
                                 continue
                             if not isinstance(res, dict):
                                 # failed to get content
@@ -112,13 +139,14 @@ def process_queue():
                             if res:
                                 upsert_item(coll, res)
                     except Exception as e:
-                        logger.error(f"Error processing item from queue: {e}")
-                        # get exception lineno
-                        import traceback
-                        exc_info = traceback.format_exc()
-                        logger.error(f"Exception info: {exc_info}")
-                        # Reinsert the item into the queue if processing fails
-                        r.push_queue_tail(REDIS_QUEUE, raw)  # Reinsert the item if processing fails
+                        logger.error(f"Error processing item from queue: {e}", exc_info=True)
+                        failed = True
+                    finally:
+                        if failed:
+                            # Reinsert the item into the queue if processing fails
+                            coordinator.requeue(raw)
+                        else:
+                            coordinator.complete(raw)
             except Exception as e:
                 logger.error(f"Error processing queue: {e}")
             finally:
@@ -134,4 +162,10 @@ def process_queue():
 if __name__ == "__main__":
     import os
     os.makedirs("screenshots", exist_ok=True)
-    process_queue()
\ No newline at end of file
+    coordinator = WorkerCoordinator(REDIS_QUEUE, redis_handler=r)
+    coordinator.install_signal_handlers()
+    coordinator.start()
+    try:
+        process_queue(coordinator)
+    finally:
+        coordinator.release()
@@ -0,0 +1,134 @@
+# utils/codec.py
+
+import json
+from typing import Any, NamedTuple, Union
+import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _select_backend(name):
+    if name == "auto":
+        return "orjson" if orjson else ("msgspec" if msgspec else "json")
+    if name == "orjson" and orjson:
+        return "orjson"
+    if name == "msgspec" and msgspec:
+        return "msgspec"
+    return "json"
+
+
+BACKEND = _select_backend(config.JSON_CODEC)
+
+# 各后端的解码异常统一以 ValueError 的子类抛出
+DecodeError = ValueError
+
+
+def dumpb(obj, default=None, pretty=False):
+    """
+    编码为 UTF-8 JSON bytes（不转义非 ASCII 字符）
+
+    :param obj: 待编码对象
+    :param default: 无法直接编码的对象的转换函数
+    :param pretty: 是否缩进输出
+    """
+    if BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            # 如超过 64 位的整数，回退到标准库
+            pass
+    elif BACKEND == "msgspec" and not pretty:
+        try:
+            return msgspec.json.encode(obj, enc_hook=default)
+        except (TypeError, msgspec.EncodeError):
+            pass
+    return _std_dumps(obj, default, pretty).encode("utf-8")
+
+
+def dumps(obj, default=None, pretty=False):
+    """编码为 JSON 字符串，参数同 dumpb"""
+    if BACKEND == "json":
+        return _std_dumps(obj, default, pretty)
+    return dumpb(obj, default, pretty).decode("utf-8")
+
+
+def _std_dumps(obj, default, pretty):
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, default=default, indent=2)
+    return json.dumps(obj, ensure_ascii=False, default=default, separators=(",", ":"))
+
+
+def loads(data):
+    """
+    解码 JSON，data 可以是 str 或 bytes
+
+    :raises DecodeError: 数据不是合法 JSON
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e)) from e
+    return json.loads(data)
+
+
+# 上传队列中的任务消息：{"userId": ..., "taskId": "...", "uploader": ..., "profile": false}
+# profile 为 true 时对该任务强制做性能分析（可选字段）
+if msgspec and BACKEND != "json":
+    class QueueItem(msgspec.Struct):
+        userId: Union[int, str]
+        taskId: str
+        uploader: Any = "unknown"
+        profile: bool = False
+
+    _queue_item_decoder = msgspec.json.Decoder(QueueItem)
+
+    def decode_queue_item(raw):
+        """
+        按任务消息 schema 解码，格式不符时返回 None（解码与校验一次完成，不构造中间 dict）
+
+        :param raw: 队列中的原始数据（str 或 bytes）
+        :return: QueueItem 或 None
+        """
+        try:
+            return _queue_item_decoder.decode(raw)
+        except msgspec.DecodeError:
+            return None
+else:
+    class QueueItem(NamedTuple):
+        userId: Union[int, str]
+        taskId: str
+        uploader: Any = "unknown"
+        profile: bool = False
+
+    def decode_queue_item(raw):
+        """
+        按任务消息 schema 解码，格式不符时返回 None
+
+        :param raw: 队列中的原始数据（str 或 bytes）
+        :return: QueueItem 或 None
+        """
+        try:
+            data = loads(raw)
+        except (DecodeError, UnicodeDecodeError):
+            return None
+        if not isinstance(data, dict):
+            return None
+        user_id, task_id = data.get("userId"), data.get("taskId")
+        if not isinstance(user_id, (int, str)) or isinstance(user_id, bool) or not isinstance(task_id, str):
+            return None
+        profile = data.get("profile", False)
+        if not isinstance(profile, bool):
+            return None
+        return QueueItem(user_id, task_id, data.get("uploader", "unknown"), profile)
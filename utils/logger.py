@@ -1,37 +1,190 @@
 # utils/logger.py
 
+import atexit
+import contextvars
+import copy
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+
+import config
+from utils import codec
+
+# 当前任务的关联 ID，按线程/上下文隔离
+_task_id = contextvars.ContextVar("task_id", default="-")
+
+# 异步模式下所有 logger 共享同一个队列和后台监听线程
+_listener = None
+_listener_lock = threading.Lock()
+_log_queue = queue.Queue(-1)
+
+
+def set_task_id(task_id):
+    """设置当前上下文的任务关联 ID，返回用于恢复的 token"""
+    return _task_id.set(str(task_id) if task_id is not None else "-")
+
+
+@contextmanager
+def task_context(task_id):
+    """在 with 块内为所有日志附加任务关联 ID"""
+    token = set_task_id(task_id)
+    try:
+        yield
+    finally:
+        _task_id.reset(token)
+
+
+class TaskIdFilter(logging.Filter):
+    """在调用线程上捕获任务关联 ID，避免后台线程格式化时丢失上下文"""
+
+    def filter(self, record):
+        if not hasattr(record, "task_id"):
+            record.task_id = _task_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按调用位置限制高频日志：每个 (文件, 行号) 每秒最多放行 max_per_second 条，
+    WARNING 及以上级别不受限制。被丢弃的条数会在下一条放行的日志中标注。
+    """
+
+    def __init__(self, max_per_second):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.max_per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = int(time.time())
+        with self._lock:
+            second, count, dropped = self._windows.get(key, (now, 0, 0))
+            if second != now:
+                second, count = now, 0
+            if count >= self.max_per_second:
+                self._windows[key] = (second, count, dropped + 1)
+                return False
+            self._windows[key] = (second, count + 1, 0)
+        record.dropped = dropped
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """文本日志，被限流丢弃的条数追加在消息末尾"""
+
+    def __init__(self):
+        super().__init__('[%(asctime)s] [%(levelname)s] [%(task_id)s] [%(module)s.%(funcName)s:%(lineno)d] %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        dropped = getattr(record, "dropped", 0)
+        if not dropped:
+            return text
+        # 异常栈在消息之后，标注加在第一行末尾
+        first, sep, rest = text.partition("\n")
+        return f"{first} (此前丢弃 {dropped} 条){sep}{rest}"
+
+
+class JsonFormatter(logging.Formatter):
+    """输出单行 JSON 结构化日志"""
+
+    def format(self, record):
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "where": f"{record.module}.{record.funcName}:{record.lineno}",
+            "task_id": getattr(record, "task_id", "-"),
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "dropped", 0):
+            data["dropped"] = record.dropped
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return codec.dumps(data)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    入队前只在调用线程上拼接消息（参数可能随后被修改，必须立即渲染），
+    时间格式化、异常栈格式化和文件 I/O 都交给后台监听线程
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _build_formatter():
+    if config.LOG_JSON:
+        return JsonFormatter()
+    return TextFormatter()
+
+
+def _build_handlers(log_file):
+    formatter = _build_formatter()
+
+    # 控制台输出
+    ch = logging.StreamHandler()
+    ch.setFormatter(formatter)
+    ch.addFilter(TaskIdFilter())
+
+    # 文件输出（滚动）
+    fh = TimedRotatingFileHandler(
+        log_file, when='midnight', interval=1, backupCount=7, encoding='utf-8'
+    )
+    fh.suffix = "%Y-%m-%d.log"
+    fh.setFormatter(formatter)
+    fh.addFilter(TaskIdFilter())
+    return [ch, fh]
+
+
+def _ensure_listener(log_file):
+    """启动（仅一次）后台日志监听线程，负责格式化和文件 I/O"""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_log_queue, *_build_handlers(log_file), respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
 
 
 class Logger:
-    def __init__(self, name=__name__, level=logging.INFO):
+    def __init__(self, name=__name__, level=logging.INFO, async_mode=None):
+        """
+        :param name: logger 名称
+        :param level: 日志级别
+        :param async_mode: 是否使用队列异步模式，为空时读取 config.LOG_ASYNC
+        """
         log_file = os.path.join('logs', f'app.log')
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
+        if async_mode is None:
+            async_mode = config.LOG_ASYNC
 
         # 避免重复添加 handler
         if not self.logger.handlers:
             os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            self.logger.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT))
 
-            # 格式化
-            formatter = logging.Formatter(
-                '[%(asctime)s] [%(levelname)s] [%(module)s.%(funcName)s:%(lineno)d] %(message)s'
-            )
-
-            # 控制台输出
-            ch = logging.StreamHandler()
-            ch.setFormatter(formatter)
-            self.logger.addHandler(ch)
-
-            # 文件输出（滚动）
-            fh = TimedRotatingFileHandler(
-                log_file, when='midnight', interval=1, backupCount=7, encoding='utf-8'
-            )
-            fh.suffix = "%Y-%m-%d.log"
-            fh.setFormatter(formatter)
-            self.logger.addHandler(fh)
+            if async_mode:
+                _ensure_listener(log_file)
+                qh = _DeferredQueueHandler(_log_queue)
+                qh.addFilter(TaskIdFilter())
+                self.logger.addHandler(qh)
+            else:
+                for handler in _build_handlers(log_file):
+                    self.logger.addHandler(handler)
 
     def get_logger(self):
         return self.logger